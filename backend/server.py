@@ -1,15 +1,23 @@
 import os
-import subprocess
+import re
+import asyncio
 import json
+import hashlib
+import datetime
+from email.utils import format_datetime
 from pathlib import Path
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from src.sourcing import SourcingEngine
+from src.sourcing_async import AsyncSourcingEngine
 from src.notifications import NotificationManager
 from src.agent import HiringAgent
+from src.storage import get_store, CandidateIndex, DEFAULT_RUN_ID, ASSESSMENT_SORTS
+from src.jobs import JobManager, Job, JobConflict, ACTIVE_STATUSES
 
 # Load .env from the backend directory
 _env_path = Path(__file__).resolve().parent / ".env"
@@ -22,6 +30,11 @@ if not os.getenv("APIFY_API_TOKEN"):
 else:
     print("✅ CEREBRAS_API_KEY & APIFY_API_TOKEN loaded successfully.")
 
+# ─── LIVE EVENTS CONFIGURATION ──────────────────────────────────────────
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "0.5"))  # seconds between checks for new events
+EVENT_HEARTBEAT = 15.0  # seconds of silence before a keep-alive comment is sent
+# ────────────────────────────────────────────────────────────────────────
+
 app = FastAPI(title="AI Hiring Agent API")
 
 @app.get("/")
@@ -39,18 +52,38 @@ class SourcingRequest(BaseModel):
     role: str
     location: str = "United States"
     search_depth: int = 10
+    shards: Optional[str] = None  # comma-separated sub-locations, or "seniority"
+    incremental: bool = False     # only surface profiles new/changed since the last run of this search
+    run_id: Optional[str] = None  # keeps this search's data apart from other searches
 
 class AnalyzeRequest(BaseModel):
     role: str
     persona: str
+    resume: bool = False
+    incremental: bool = False
+    run_id: Optional[str] = None
+
+class PipelineRequest(BaseModel):
+    role: str
+    location: str = "United States"
+    search_depth: int = 10
+    persona: Optional[str] = None
+    run_id: Optional[str] = None
 
 class OutreachRequest(BaseModel):
     candidate_id: str
     personalized_message: str
 
 sourcing_engine = SourcingEngine()
+# Shares one pooled Apify HTTP session; used by the request handlers so they don't hold threads
+async_sourcing_engine = AsyncSourcingEngine(profile_store=sourcing_engine.profile_store)
 notification_manager = NotificationManager()
 agent = HiringAgent()
+store = get_store()
+# O(1) candidate lookups for /generate-message, invalidated by each run's data version
+candidate_index = CandidateIndex(store)
+# Stages run in-process on a bounded pool and reuse the clients above
+job_manager = JobManager(sourcer=sourcing_engine, llm_client=agent.client)
 
 @app.on_event("startup")
 async def startup_event():
@@ -105,62 +138,83 @@ async def startup_event():
     polling_thread = threading.Thread(target=poll_replies_worker, daemon=True)
     polling_thread.start()
 
+    # Old runs (every UI search creates one) are only deleted by retention
+    _prune_runs()
+
     if os.getenv("CEREBRAS_API_KEY"):
         print("✅ CEREBRAS API KEY: LOADED")
     else:
         print("❌ CEREBRAS API KEY: MISSING")
     print("="*50 + "\n")
 
-def write_status(stage: str, message: str):
-    """Write pipeline status to a JSON file for frontend polling."""
-    import datetime
-    from datetime import timezone
-    status = {"stage": stage, "message": message, "timestamp": datetime.datetime.now(timezone.utc).isoformat()}
-    try:
-        with open("pipeline_status.json", "w", encoding="utf-8") as f:
-            json.dump(status, f, indent=2)
-    except Exception as e:
-        print(f"⚠️ Warning: Could not write status: {e}")
+@app.on_event("shutdown")
+def shutdown_event():
+    # Running in-process stages stop at their next progress update
+    job_manager.shutdown()
+
+_RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def _run_id(run_id: Optional[str]) -> str:
+    """The run a request addresses; requests without one share DEFAULT_RUN_ID."""
+    run_id = run_id or DEFAULT_RUN_ID
+    if not _RUN_ID_PATTERN.match(run_id):
+        raise HTTPException(status_code=400, detail="run_id may only contain letters, digits, '-' and '_' (max 64).")
+    return run_id
 
-def _run_stage(stage: str, role: str, location: str = "United States", search_depth: int = 10, persona_text: str = None):
-    """Run a specific pipeline stage as a subprocess."""
-    # Save persona if provided
+def _prune_runs(keep_run_id: Optional[str] = None):
+    """Apply run retention; runs with a job in progress (and the one being started) are kept."""
+    busy = {job.run_id for job in job_manager.list() if job.status in ACTIVE_STATUSES}
+    if keep_run_id:
+        busy.add(keep_run_id)
+    for run_id in store.prune_runs(exclude=busy):
+        candidate_index.forget(run_id)
+        print(f"🧹 Pruned run {run_id}")
+
+def _run_stage(stage: str, role: str, location: str = "United States", search_depth: int = 10, persona_text: str = None, resume: bool = False, extra_args: Optional[List[str]] = None, run_id: str = DEFAULT_RUN_ID) -> Job:
+    """Queue a pipeline stage for a run on the job runner; raises JobConflict if that run already has one."""
+    active = job_manager.active_job(run_id)
+    if active:
+        raise JobConflict(active)
+    _prune_runs(keep_run_id=run_id)
+
+    # Save persona if provided; the stage reads it back from the store
     if persona_text:
-        with open("persona.txt", "w", encoding="utf-8") as f:
-            f.write(persona_text)
+        store.set_persona(run_id, persona_text)
 
     # IMMEDIATE STATUS RESET: Prevent frontend from seeing old results
     status_map = {
         "source": ("sourcing", f"Initializing search for '{role}'..."),
-        "analyze": ("analyzing", "Initializing Analysis...")
+        "analyze": ("analyzing", "Initializing Analysis..."),
+        "pipeline": ("sourcing", f"Initializing streaming search + analysis for '{role}'...")
     }
-    s_stage, s_msg = status_map.get(stage, (stage, f"Starting {stage}..."))
-    write_status(s_stage, s_msg)
+    initial_status = status_map.get(stage, (stage, f"Starting {stage}..."))
 
-    cmd = [
-        "python", "-m", "src.main",
+    argv = [
         "--stage", stage,
         "--role", role,
         "--location", location,
         "--search_depth", str(search_depth),
+        "--run_id", run_id,
     ]
-    if persona_text:
-        cmd += ["--persona", "persona.txt"]
-
-    env = os.environ.copy()
-    env["PYTHONIOENCODING"] = "utf-8"
-
-    with open("analysis.log", "a", encoding="utf-8") as log_file:
-        log_file.write(f"\n\n--- Stage: {stage} for {role} ---\n")
-        subprocess.Popen(cmd, stdout=log_file, stderr=log_file, env=env)
+    if resume:
+        argv += ["--resume"]
+    if extra_args:
+        argv += extra_args
+    return job_manager.submit(stage, argv, run_id=run_id, status=initial_status)
 
 
 # ─── STAGE 1: SOURCE ────────────────────────────────────────────────
 @app.post("/start-sourcing")
 def start_sourcing(req: SourcingRequest):
+    run_id = _run_id(req.run_id)
     try:
-        _run_stage("source", req.role, req.location, req.search_depth)
-        return {"status": "started", "message": "Sourcing started. Searching LinkedIn for Open-to-Work candidates..."}
+        extra_args = ["--shards", req.shards] if req.shards else []
+        if req.incremental:
+            extra_args.append("--incremental")
+        job = _run_stage("source", req.role, req.location, req.search_depth, extra_args=extra_args, run_id=run_id)
+        return {"status": "started", "job_id": job.id, "run_id": run_id, "message": "Sourcing started. Searching LinkedIn for Open-to-Work candidates..."}
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -168,43 +222,202 @@ def start_sourcing(req: SourcingRequest):
 # ─── STAGE 2: AI ANALYZE (Final AI assessment) ──────────────────────
 @app.post("/start-analyze")
 def start_analyze(req: AnalyzeRequest):
-    if not os.path.exists("sourced_candidates.json"):
+    run_id = _run_id(req.run_id)
+    if not store.count_candidates(run_id):
         raise HTTPException(status_code=400, detail="No sourced candidates. Run Sourcing first.")
     try:
-        _run_stage("analyze", req.role, persona_text=req.persona)
-        return {"status": "started", "message": "Running AI assessment on sourced profiles..."}
+        job = _run_stage("analyze", req.role, persona_text=req.persona, resume=req.resume, extra_args=["--incremental"] if req.incremental else None, run_id=run_id)
+        return {"status": "started", "job_id": job.id, "run_id": run_id, "message": "Running AI assessment on sourced profiles..."}
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ─── STAGES 1+2 STREAMED (Source and analyze in one overlapping pass) ─
+@app.post("/start-pipeline")
+def start_pipeline(req: PipelineRequest):
+    run_id = _run_id(req.run_id)
+    try:
+        job = _run_stage("pipeline", req.role, req.location, req.search_depth, persona_text=req.persona, run_id=run_id)
+        return {"status": "started", "job_id": job.id, "run_id": run_id, "message": "Streaming pipeline started. Candidates are assessed as they are found..."}
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ─── RUNS & JOBS ────────────────────────────────────────────────────
+@app.get("/runs")
+def list_runs():
+    return {"runs": store.list_runs()}
+
+@app.delete("/runs/{run_id}")
+def delete_run(run_id: str):
+    """Delete a run with its candidates, assessments, status and events."""
+    run_id = _run_id(run_id)
+    active = job_manager.active_job(run_id)
+    if active:
+        raise HTTPException(status_code=409, detail=f"Job {active.id} is still {active.status} for this run. Cancel it first.")
+    if not store.delete_run(run_id):
+        raise HTTPException(status_code=404, detail="Run not found.")
+    candidate_index.forget(run_id)
+    return {"status": "deleted", "run_id": run_id}
+
+@app.get("/jobs")
+def list_jobs(run_id: Optional[str] = None):
+    jobs = job_manager.list()
+    if run_id:
+        jobs = [job for job in jobs if job.run_id == run_id]
+    return {"jobs": [job.to_dict() for job in jobs]}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
+
+
 # ─── DATA ENDPOINTS ─────────────────────────────────────────────────
+def _not_modified(request: Request, response: Response, run_id: str) -> bool:
+    """
+    Set ETag / Last-Modified from the run's data version; True if the client's
+    ETag (If-None-Match) is still current.
+    """
+    version, updated_at = store.data_version(run_id)
+    # Same data, different page/filter -> different representation; a cache-buster `t` is not part of it
+    query = sorted((k, v) for k, v in request.query_params.multi_items() if k != "t")
+    query_hash = hashlib.sha1(str(query).encode("utf-8")).hexdigest()[:12]
+    etag = f'W/"{run_id}-{version}-{query_hash}"'
+    response.headers["ETag"] = etag
+    # Revalidate on every poll, but let unchanged data come back as an empty 304
+    response.headers["Cache-Control"] = "no-cache"
+    if updated_at:
+        # Informational only: whole seconds can't tell apart two writes in the same second,
+        # so If-Modified-Since is never used to answer 304 -- the version in the ETag is
+        modified = datetime.datetime.fromisoformat(updated_at)
+        response.headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*"
+    return False
+
+
+def _select_fields(records: List[dict], fields: Optional[str]) -> List[dict]:
+    if not fields:
+        return records
+    keep = [f.strip() for f in fields.split(",") if f.strip()]
+    return [{k: r[k] for k in keep if k in r} for r in records]
+
+
+def _page_limit(limit: Optional[int]) -> int:
+    # SQLite: a negative LIMIT means no limit
+    return -1 if limit is None else max(0, limit)
+
+
 @app.get("/sourced")
-def get_sourced():
-    if not os.path.exists("sourced_candidates.json"):
-        return {"sourced": []}
-    with open("sourced_candidates.json", "r", encoding="utf-8") as f:
-        return {"sourced": json.load(f)}
+def get_sourced(request: Request, response: Response, run_id: Optional[str] = None, limit: Optional[int] = None, offset: int = 0, otw: Optional[bool] = None, fields: Optional[str] = None):
+    """Sourced candidates of a run in sourced order; optional paging, OTW filter and field selection."""
+    run_id = _run_id(run_id)
+    if _not_modified(request, response, run_id):
+        return Response(status_code=304, headers=dict(response.headers))
+    sourced, total = store.query_candidates(run_id, otw=otw, limit=_page_limit(limit), offset=max(0, offset))
+    return {"sourced": _select_fields(sourced, fields), "total": total, "offset": offset, "limit": limit}
 
 @app.get("/results")
-def get_results():
-    if not os.path.exists("results.json"):
-        return {"results": []}
-    with open("results.json", "r", encoding="utf-8") as f:
-        return {"results": json.load(f)}
+def get_results(
+    request: Request,
+    response: Response,
+    run_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    sort: str = "position",
+    order: str = "asc",
+    tier: Optional[int] = None,
+    action: Optional[str] = None,
+    otw: Optional[bool] = None,
+    fields: Optional[str] = None,
+):
+    """
+    A run's assessments (including partial results streamed in while it is in progress).
+    sort: position | score | tier, order: asc | desc; filters on tier, recommended action and OTW.
+    """
+    if sort not in ASSESSMENT_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {sorted(ASSESSMENT_SORTS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    run_id = _run_id(run_id)
+    if _not_modified(request, response, run_id):
+        return Response(status_code=304, headers=dict(response.headers))
+    results, total = store.query_assessments(
+        run_id, tier=tier, action=action, otw=otw,
+        sort=sort, descending=order == "desc", limit=_page_limit(limit), offset=max(0, offset),
+    )
+    return {"results": _select_fields(results, fields), "total": total, "offset": offset, "limit": limit}
 
 @app.get("/status")
-def get_status(response: Response):
+def get_status(response: Response, run_id: Optional[str] = None):
     response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    if not os.path.exists("pipeline_status.json"):
-        return {"stage": "idle", "message": "No analysis running."}
-    with open("pipeline_status.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+    return store.get_status(_run_id(run_id)) or {"stage": "idle", "message": "No analysis running."}
+
+@app.get("/events")
+async def stream_events(request: Request, run_id: Optional[str] = None, last_event_id: Optional[int] = None):
+    """
+    Server-Sent Events: `status`, `sourced`, `result` and `reset` events as the
+    pipeline writes them for one run. Reconnects resume after the Last-Event-ID header (or
+    ?last_event_id=); a fresh connection starts from now. Resuming from before the run's
+    retained events starts with a `reset`.
+    """
+    run_id = _run_id(run_id)
+    header_id = request.headers.get("last-event-id")
+    if header_id and header_id.isdigit():
+        last_event_id = int(header_id)
+    if last_event_id is None:
+        last_event_id = await asyncio.to_thread(store.last_event_id, run_id)
+
+    async def event_stream():
+        cursor = last_event_id
+        quiet = 0.0
+        yield "retry: 3000\n\n"
+        while not await request.is_disconnected():
+            floor = await asyncio.to_thread(store.events_floor, run_id)
+            if cursor < floor:
+                # Events after the cursor were pruned: tell the client to refetch instead of replaying
+                cursor = floor
+                yield f'id: {cursor}\nevent: reset\ndata: {{"scope": "run"}}\n\n'
+            events = await asyncio.to_thread(store.events_since, run_id, cursor)
+            for event_id, event_type, data in events:
+                cursor = event_id
+                yield f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+            if events:
+                quiet = 0.0
+                continue
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+            quiet += EVENT_POLL_INTERVAL
+            if quiet >= EVENT_HEARTBEAT:
+                quiet = 0.0
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.post("/send-outreach")
-def send_outreach(req: OutreachRequest):
+async def send_outreach(req: OutreachRequest):
     """Trigger the LinkedIn Message Sender Phantom."""
     try:
-        success = sourcing_engine.send_outreach(req.candidate_id, req.personalized_message)
+        success = await async_sourcing_engine.send_outreach_async(req.candidate_id, req.personalized_message)
         if success:
             return {"status": "success", "message": f"Message sent to {req.candidate_id}"}
         else:
@@ -213,44 +426,35 @@ def send_outreach(req: OutreachRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/generate-message")
-def generate_message(candidate_id: str, role: str):
+def generate_message(candidate_id: str, role: str, run_id: Optional[str] = None):
     """Use AI to generate a personalized message based on the assessment."""
     try:
-        results_path = Path("results.json")
-        candidate = None
-        if results_path.exists():
-            with open(results_path, "r", encoding="utf-8") as f:
-                results = json.load(f)
-            candidate = next((c for c in results if c.get('candidate_id') == candidate_id), None)
-        if not candidate:
-            ds_path = Path("deep_scraped_candidates.json")
-            if ds_path.exists():
-                with open(ds_path, "r", encoding="utf-8") as f:
-                    ds = json.load(f)
-                    candidate = next((c for c in ds if c.get('id') == candidate_id), None)
+        run_id = _run_id(run_id)
+        candidate = candidate_index.get(run_id, candidate_id)
         if not candidate:
             return {"message": f"Hi, I saw your profile for the {role} role and would love to chat!"}
         strengths = candidate.get('role_fit_analysis', {}).get('strengths', [])
         strength = strengths[0] if strengths else "impressive background"
         prompt = f"Write a professional, warm 2-sentence LinkedIn outreach message for a {role} role. Mention their specific strength: {strength}. Keep it under 300 characters."
-        resp = agent.client.chat.completions.create(model=agent.model, messages=[{"role": "user", "content": prompt}])
+        resp = agent.chat_completion(model=agent.model, messages=[{"role": "user", "content": prompt}])
         return {"message": resp.choices[0].message.content.strip()}
     except Exception as e:
         return {"message": f"Hi, I saw your profile for the {role} role and would love to chat!"}
 
 @app.get("/check-replies")
 @app.post("/check-replies")
-def check_replies():
+async def check_replies():
     """Manual trigger to check for LinkedIn replies and send WhatsApp alerts."""
     try:
-        threads = sourcing_engine.check_replies()
+        threads = await async_sourcing_engine.check_replies_async()
         new_replies_count = 0
         for thread in threads:
             last_msg = thread.get('lastMessage', {})
             if not last_msg.get('fromMe'):
                 name = thread.get('fullName', 'A candidate')
                 snippet = last_msg.get('text', 'No text')
-                notification_manager.notify_new_reply(name, snippet)
+                # Twilio's client is blocking; keep it off the event loop
+                await asyncio.to_thread(notification_manager.notify_new_reply, name, snippet)
                 new_replies_count += 1
         return {"status": "success", "replies_found": new_replies_count}
     except Exception as e:
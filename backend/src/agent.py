@@ -1,29 +1,63 @@
 import os
 import json
 import re
-from typing import List, Dict
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
 from openai import OpenAI
 from .models import CandidateProfile, CandidateAssessment, RoleFitScore
+from .cache import AssessmentCache
+from .profile_text import render_experience, estimate_tokens, PromptStats, EXPERIENCE_TOKEN_BUDGET
+from .resilience import ResilientCaller, CircuitBreaker, get_breaker
+from .ratelimit import AdaptiveLimiter, get_limiter
+
+# ─── QUICK FILTER TUNING ────────────────────────────────────────────────
+QUICK_FILTER_BATCH_CHARS = 4000   # headline characters per request
+QUICK_FILTER_MAX_BATCH = 60       # hard cap on candidates per request
+QUICK_FILTER_CONCURRENCY = 8      # requests in flight at once
+QUICK_FILTER_MAX_ATTEMPTS = 3     # rounds before an unscored candidate gets 0
+LLM_EXPECTED_COMPLETION_TOKENS = 600  # reply size assumed when budgeting tokens/minute
+# ────────────────────────────────────────────────────────────────────────
 
 class HiringAgent:
     """
     The Brain of the AI Hiring Intelligence Agent.
     Handles quick filtering and deep assessment using Cerebras AI.
     """
-    def __init__(self, api_key: str = None, model: str = "llama3.1-8b"):
+    def __init__(self, api_key: str = None, model: str = "llama3.1-8b", cache: Optional[AssessmentCache] = None, experience_token_budget: int = EXPERIENCE_TOKEN_BUDGET, client: Optional[OpenAI] = None, limiter: Optional[AdaptiveLimiter] = None, breaker: Optional[CircuitBreaker] = None):
         self.api_key = api_key or os.getenv("CEREBRAS_API_KEY")
         self.model = model
-        self.client = OpenAI(
+        self.cache = cache
+        self.experience_token_budget = experience_token_budget
+        self.prompt_stats = PromptStats()
+        # Retries are handled by our own resilience layer, not the SDK.
+        # A shared client (and its connection pool) can be passed in by long-lived callers.
+        self.client = client or (OpenAI(
             api_key=self.api_key,
-            base_url="https://api.cerebras.ai/v1"
-        ) if self.api_key else None
+            base_url="https://api.cerebras.ai/v1",
+            max_retries=0
+        ) if self.api_key else None)
+        # Adapts how many calls run at once to the provider's rate limits; like the
+        # circuit breaker, shared by every agent in the process unless one is passed in
+        self.limiter = limiter or get_limiter()
+        self.resilience = ResilientCaller(limiter=self.limiter, breaker=breaker or get_breaker())
         
         if not self.client:
             print("⚠️  WARNING: Cerebras API Key not found. Agent cannot perform analysis.")
 
+    def chat_completion(self, deadline: Optional[float] = None, **kwargs):
+        """
+        client.chat.completions.create with backoff, circuit breaker, adaptive rate limiting and optional hedging.
+        `deadline` (time.monotonic() value) caps the call including all retries.
+        """
+        prompt_tokens = sum(estimate_tokens(m.get("content")) for m in kwargs.get("messages", []))
+        return self.resilience.call(self.client.chat.completions.create, cost=prompt_tokens + LLM_EXPECTED_COMPLETION_TOKENS, deadline=deadline, **kwargs)
+
     def quick_filter(self, candidates: List[CandidateProfile], role: str, limit: int = 50, ideal_persona: str = None) -> List[tuple]:
         """
         Fast assessment of many candidates based on search snippets to identify top candidates for deep scraping.
+        Batches are sized by prompt length and run concurrently; candidates missing from a
+        reply are re-queued (up to QUICK_FILTER_MAX_ATTEMPTS) instead of being scored 0.
         Returns a list of (score, candidate) tuples.
         """
         if not self.client:
@@ -35,14 +69,46 @@ class HiringAgent:
         print(f"🎯 AI Filtering {len(candidates)} candidates for best fit...")
         
         persona_context = f"\nIDEAL PERSONA REQUIREMENTS:\n{ideal_persona}" if ideal_persona else ""
-        
-        # We'll process candidates in batches to be efficient
-        batch_size = 20
-        scored_candidates = []
-        
-        for i in range(0, len(candidates), batch_size):
-            batch = candidates[i:i+batch_size]
-            prompt = f"""
+        scores: Dict[int, int] = {}
+        queue = list(range(len(candidates)))
+
+        for attempt in range(1, QUICK_FILTER_MAX_ATTEMPTS + 1):
+            if not queue:
+                break
+            batches = self._filter_batches(candidates, queue)
+            print(f"   ⚡ Round {attempt}: {len(queue)} candidates in {len(batches)} parallel batches...")
+            with ThreadPoolExecutor(max_workers=QUICK_FILTER_CONCURRENCY) as pool:
+                futures = [pool.submit(self._score_filter_batch, candidates, batch, role, persona_context) for batch in batches]
+                for future in futures:
+                    scores.update(future.result())
+            queue = [i for i in queue if i not in scores]
+            if queue and attempt < QUICK_FILTER_MAX_ATTEMPTS:
+                print(f"   🔁 {len(queue)} candidates missing from replies, re-queueing...")
+
+        if queue:
+            print(f"⚠️ Filter gave up on {len(queue)} candidates after {QUICK_FILTER_MAX_ATTEMPTS} attempts.")
+        scored_candidates = [(scores.get(i, 0), c) for i, c in enumerate(candidates)]
+        scored_candidates.sort(key=lambda x: x[0], reverse=True)
+        return scored_candidates[:limit]
+
+    def _filter_batches(self, candidates: List[CandidateProfile], indices: List[int]) -> List[List[int]]:
+        """Pack candidates into batches bounded by prompt characters and item count."""
+        batches, batch, size = [], [], 0
+        for i in indices:
+            line_len = len(candidates[i].name or "") + len(candidates[i].headline or "") + 8
+            if batch and (size + line_len > QUICK_FILTER_BATCH_CHARS or len(batch) >= QUICK_FILTER_MAX_BATCH):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(i)
+            size += line_len
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _score_filter_batch(self, candidates: List[CandidateProfile], batch: List[int], role: str, persona_context: str) -> Dict[int, int]:
+        """Score one batch. Returns {candidate index: score} only for candidates the reply covered."""
+        lines = "\n".join(f"{n}. {candidates[i].name}: {candidates[i].headline}" for n, i in enumerate(batch, start=1))
+        prompt = f"""
             You are a master recruiter specialized in technical hiring for "{role}".{persona_context}
             
             Score these {len(batch)} candidates from 0-100 based on their LinkedIn Headline.
@@ -52,51 +118,62 @@ class HiringAgent:
             2. Seniority: Is the candidate a Lead, Senior, or specialized Expert?
             3. Persona Match: How well do they fit the specific 'Ideal Persona' requirements above?
             
-            Return ONLY a raw JSON list of numbers in the same order.
-            Example: [85, 40, 92]
+            Return ONLY a raw JSON list with one object per candidate, using the candidate number.
+            Example: [{{"n": 1, "score": 85}}, {{"n": 2, "score": 40}}]
             
             Candidates:
-            {[f"{c.name}: {c.headline}" for c in batch]}
+            {lines}
             """
-            
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                content = response.choices[0].message.content
-                # Parse scores
-                scores = []
-                try: 
-                    match = re.search(r'\[.*\]', content, re.DOTALL)
-                    scores = json.loads(match.group()) if match else []
-                except:
-                    scores = [int(s) for s in re.findall(r'\d+', content)]
-                
-                # Align scores with batch size
-                if len(scores) < len(batch):
-                    scores += [0] * (len(batch) - len(scores))
-                
-                for cand, raw_score in zip(batch, scores[:len(batch)]):
-                    score = 0
-                    if isinstance(raw_score, dict):
-                        score = int(raw_score.get('score', 0))
-                    elif isinstance(raw_score, (int, float)):
-                        score = int(raw_score)
-                    scored_candidates.append((score, cand))
-            except Exception as e:
-                print(f"⚠️ Filter error: {e}")
-                for cand in batch: scored_candidates.append((0, cand))
+        try:
+            response = self.chat_completion(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            content = response.choices[0].message.content
+            match = re.search(r'\[.*\]', content, re.DOTALL)
+            parsed = json.loads(match.group()) if match else []
+        except Exception as e:
+            print(f"⚠️ Filter error: {e}")
+            return {}
 
-        scored_candidates.sort(key=lambda x: x[0], reverse=True)
-        return scored_candidates[:limit]
+        result = {}
+        if parsed and all(isinstance(x, (int, float)) for x in parsed):
+            # Plain list of numbers: only trustworthy if it lines up exactly
+            if len(parsed) == len(batch):
+                result = {i: int(x) for i, x in zip(batch, parsed)}
+            return result
+        for entry in parsed:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                n = int(entry.get("n"))
+                score = int(entry.get("score", 0))
+            except (TypeError, ValueError):
+                continue
+            if 1 <= n <= len(batch):
+                result[batch[n - 1]] = max(0, min(100, score))
+        return result
 
-    def assess_candidate(self, candidate: CandidateProfile, role_description: str, ideal_persona: str = None) -> CandidateAssessment:
+    def assess_candidate(
+        self, candidate: CandidateProfile, role_description: str, ideal_persona: str = None,
+        timeout: float = 45.0, deadline: Optional[float] = None,
+    ) -> CandidateAssessment:
         """
         Full deep analysis of a candidate against a role and persona.
+        `timeout` caps the time spent on this one candidate (seconds), retries included;
+        a `deadline` (time.monotonic() value) replaces it, e.g. to stay within a batch's budget.
         """
         if not self.client:
             raise ValueError(f"❌ Cerebras API Key is missing. Cannot assess {candidate.name}.")
+        if deadline is None:
+            deadline = time.monotonic() + timeout
+
+        cache_key = None
+        if self.cache:
+            cache_key = AssessmentCache.make_key(candidate, role_description, ideal_persona, self.model)
+            cached = self._cache_get(cache_key, candidate)
+            if cached:
+                return cached
 
         persona_context = f"\nBOSS'S IDEAL CANDIDATE REQUIREMENTS:\n{ideal_persona}" if ideal_persona else ""
         
@@ -109,7 +186,7 @@ class HiringAgent:
         CANDIDATE DATA:
         Name: {candidate.name}
         Headline: {candidate.headline}
-        Experience: {candidate.experience_text}
+        Experience: {self._experience_for_prompt(candidate)}
         
         TASK:
         1. Compare Candidate Experience vs Boss's Requirements.
@@ -138,40 +215,182 @@ class HiringAgent:
             """
             
         try:
-            resp = self.client.chat.completions.create(
+            resp = self.chat_completion(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 response_format={"type": "json_object"},
-                timeout=45.0
+                timeout=timeout,
+                deadline=deadline
             )
             content = resp.choices[0].message.content
             # Pre-clean the content just in case
             content = self._clean_json(content)
             data = json.loads(content)
             data['model_used'] = self.model
+            # Keep our own ID so results can be joined back (resume, lookups)
+            data['candidate_id'] = candidate.id
             # Ensure name is present even if AI missed it
             if 'candidate_name' not in data:
                 data['candidate_name'] = candidate.name
-            return CandidateAssessment(**data)
+            assessment = CandidateAssessment(**data)
         except Exception as e:
             print(f"   ❌ Assessment failed: {e}")
             # Fallback to prevent pipeline crash
-            return CandidateAssessment(
-                candidate_id=candidate.id,
-                candidate_name=candidate.name,
-                overall_score=0,
-                tier=3,
-                recommended_action="Review",
-                role_fit_analysis=RoleFitScore(
-                    score=0,
-                    strengths=[],
-                    gaps=["AI Analysis Failed"],
-                    evidence=f"Error: {str(e)[:100]}",
-                    explanation="Automated assessment encountered an error."
-                ),
-                reasoning_summary="AI Assessment failed due to technical error. Please review manually.",
-                risk_flags=["AI Error"]
+            return self._fallback_assessment(candidate, e)
+        if cache_key:
+            self._cache_put(cache_key, assessment)
+        return assessment
+
+    def assess_batch(self, candidates: List[CandidateProfile], role_description: str, ideal_persona: str = None, timeout: float = 90.0) -> List[CandidateAssessment]:
+        """
+        Assess several candidates in ONE chat completion (role + persona sent once).
+        Each returned entry is validated on its own; any candidate whose entry is
+        missing or malformed falls back to a single-candidate assess_candidate call.
+        `timeout` covers the whole batch, fallback calls included.
+        Results are returned in the same order as `candidates`.
+        """
+        if not self.client:
+            raise ValueError("❌ Cerebras API Key is missing. Cannot perform AI analysis.")
+        deadline = time.monotonic() + timeout
+
+        results: List[Optional[CandidateAssessment]] = [None] * len(candidates)
+        cache_keys: Dict[int, str] = {}
+        pending = []
+        for i, c in enumerate(candidates):
+            if self.cache:
+                cache_keys[i] = AssessmentCache.make_key(c, role_description, ideal_persona, self.model)
+                results[i] = self._cache_get(cache_keys[i], c)
+            if results[i] is None:
+                pending.append(i)
+
+        if len(pending) == 1:
+            i = pending[0]
+            results[i] = self.assess_candidate(candidates[i], role_description, ideal_persona, timeout=timeout, deadline=deadline)
+            return results
+        if not pending:
+            return results
+
+        persona_context = f"\nBOSS'S IDEAL CANDIDATE REQUIREMENTS:\n{ideal_persona}" if ideal_persona else ""
+        blocks = "\n".join(
+            f"--- CANDIDATE (candidate_id: {candidates[i].id}) ---\n"
+            f"Name: {candidates[i].name}\n"
+            f"Headline: {candidates[i].headline}\n"
+            f"Experience: {self._experience_for_prompt(candidates[i])}\n"
+            for i in pending
+        )
+        prompt = f"""
+        You are an expert technical recruiter. Analyze EACH of the {len(pending)} candidates below for the role: {role_description}
+
+        BOSS'S REQUIREMENTS (Must Have):
+        {persona_context}
+
+        {blocks}
+
+        TASK (for every candidate independently):
+        1. Compare Candidate Experience vs Boss's Requirements.
+        2. Look for specific evidence (Years of XP, specific tech stacks, leadership roles).
+        3. Be strict. If they lack a "Must Have", score them low.
+
+            Provide a strict JSON response with one entry per candidate, copying each candidate_id exactly:
+            {{
+                "assessments": [
+                    {{
+                        "candidate_id": "...",
+                        "candidate_name": "...",
+                        "overall_score": 0-100,
+                        "tier": 1 (Perfect Match), 2 (Good Match), or 3 (Mismatch),
+                        "recommended_action": "Shortlist", "Review", "Hold", or "Reject",
+                        "role_fit_analysis": {{
+                            "score": 0-100,
+                            "strengths": ["List specific skills/experience found"],
+                            "gaps": ["List missing requirements"],
+                            "evidence": "MUST BE A STRING. Brief excerpts from their profile that justify the score.",
+                            "explanation": "MUST BE A STRING. Why the candidate got this score."
+                        }},
+                        "reasoning_summary": "A 2-sentence summary for the hiring manager.",
+                        "risk_flags": ["Job hopping", "Career gap", "Junior role", "Irrelevant industry"]
+                    }}
+                ]
+            }}
+
+            IMPORTANT: All text fields like "evidence", "explanation", "reasoning_summary" MUST be plain strings, NOT objects.
+            """
+
+        entries = []
+        try:
+            resp = self.chat_completion(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"},
+                timeout=timeout,
+                deadline=deadline
             )
+            data = json.loads(self._clean_json(resp.choices[0].message.content))
+            entries = data.get("assessments", []) if isinstance(data, dict) else data
+            if not isinstance(entries, list):
+                entries = []
+        except Exception as e:
+            print(f"   ⚠️ Batch assessment failed ({len(pending)} candidates), falling back to single calls: {e}")
+
+        by_id = {e.get("candidate_id"): e for e in entries if isinstance(e, dict)}
+        for i in pending:
+            c = candidates[i]
+            entry = by_id.get(c.id)
+            if entry is not None:
+                try:
+                    entry = {**entry, "candidate_id": c.id, "model_used": self.model}
+                    entry.setdefault("candidate_name", c.name)
+                    results[i] = CandidateAssessment(**entry)
+                except Exception as e:
+                    print(f"   ⚠️ Invalid batch entry for {c.name}: {e}")
+                else:
+                    if i in cache_keys:
+                        self._cache_put(cache_keys[i], results[i])
+                    continue
+            # Missing or malformed -> single-candidate call, in whatever time the batch has left
+            results[i] = self.assess_candidate(c, role_description, ideal_persona, timeout=timeout, deadline=deadline)
+
+        return results
+
+    def _cache_get(self, key: str, candidate: CandidateProfile) -> Optional[CandidateAssessment]:
+        # The cache only saves money; a locked or broken cache file is just a miss
+        try:
+            return self.cache.get(key, candidate)
+        except Exception as e:
+            print(f"   ⚠️ Assessment cache read failed: {e}")
+            return None
+
+    def _cache_put(self, key: str, assessment: CandidateAssessment):
+        # Never let a failed cache write throw away an assessment we already paid for
+        try:
+            self.cache.put(key, assessment)
+        except Exception as e:
+            print(f"   ⚠️ Assessment cache write failed: {e}")
+
+    def _experience_for_prompt(self, candidate: CandidateProfile) -> str:
+        """Compact, budgeted experience text; records before/after token counts."""
+        compact = render_experience(candidate.experience_text, self.experience_token_budget)
+        self.prompt_stats.record(candidate.experience_text or "", compact)
+        return compact
+
+    def _fallback_assessment(self, candidate: CandidateProfile, error: Exception) -> CandidateAssessment:
+        """Score-0 placeholder used when the AI call fails, so the pipeline never crashes."""
+        return CandidateAssessment(
+            candidate_id=candidate.id,
+            candidate_name=candidate.name,
+            overall_score=0,
+            tier=3,
+            recommended_action="Review",
+            role_fit_analysis=RoleFitScore(
+                score=0,
+                strengths=[],
+                gaps=["AI Analysis Failed"],
+                evidence=f"Error: {str(error)[:100]}",
+                explanation="Automated assessment encountered an error."
+            ),
+            reasoning_summary="AI Assessment failed due to technical error. Please review manually.",
+            risk_flags=["AI Error"]
+        )
 
     def _clean_json(self, text: str) -> str:
         # Remove markdown code blocks if present
@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Optional
+from .models import CandidateProfile, CandidateAssessment
+
+# ─── ASSESSMENT CACHE CONFIGURATION ─────────────────────────────────────
+ASSESSMENT_CACHE_PATH = os.getenv("ASSESSMENT_CACHE_PATH", "assessment_cache.db")
+ASSESSMENT_CACHE_MAX_ENTRIES = int(os.getenv("ASSESSMENT_CACHE_MAX_ENTRIES", "20000"))
+ASSESSMENT_CACHE_TTL = float(os.getenv("ASSESSMENT_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+# ────────────────────────────────────────────────────────────────────────
+
+
+class AssessmentCache:
+    """
+    Persistent, content-addressed cache for CandidateAssessment results.
+    Keyed by a hash of the profile text, role, persona and model, so any change
+    to what the LLM would see produces a new key. Entries expire after `ttl`
+    seconds and the least recently used ones are evicted past `max_entries`.
+    """
+    def __init__(self, path: str = ASSESSMENT_CACHE_PATH, max_entries: int = ASSESSMENT_CACHE_MAX_ENTRIES, ttl: float = ASSESSMENT_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Several jobs (and processes) share this file; wait for the write lock rather than fail
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS assessments ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON assessments(accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(candidate: CandidateProfile, role_description: str, ideal_persona: Optional[str], model: str) -> str:
+        payload = json.dumps({
+            "headline": candidate.headline or "",
+            "experience_text": candidate.experience_text or "",
+            "about": candidate.about or "",
+            "role": role_description or "",
+            "persona": ideal_persona or "",
+            "model": model,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, candidate: CandidateProfile) -> Optional[CandidateAssessment]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM assessments WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM assessments WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if not row:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE assessments SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+
+        data = json.loads(row[0])
+        # Same content can belong to a different profile id (e.g. re-sourced URL)
+        data["candidate_id"] = candidate.id
+        data["candidate_name"] = candidate.name
+        return CandidateAssessment(**data)
+
+    def put(self, key: str, assessment: CandidateAssessment):
+        now = time.time()
+        # One transaction: rolled back as a whole if the database stays locked
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO assessments (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, assessment.model_dump_json(), now, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM assessments").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM assessments WHERE key IN (SELECT key FROM assessments ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,45 @@
+"""
+Checkpoint / resume support for the analysis stage.
+
+A run is identified by a fingerprint of role, persona and model, kept on the
+run's row in the pipeline store. The set of candidates already assessed in
+that run is the streamed assessments table, so a `--resume` after a crash or
+restart only sends the remaining candidates to the LLM.
+"""
+
+import json
+import hashlib
+from typing import Dict, Optional
+from .storage import PipelineStore, DEFAULT_RUN_ID, get_store
+
+
+def run_fingerprint(role: str, ideal_persona: Optional[str], model: str) -> str:
+    payload = json.dumps({"role": role or "", "persona": ideal_persona or "", "model": model}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RunCheckpoint:
+    def __init__(self, role: str, ideal_persona: Optional[str], model: str, store: Optional[PipelineStore] = None, run_id: str = DEFAULT_RUN_ID):
+        self.store = store or get_store()
+        self.run_id = run_id
+        self.role = role
+        self.model = model
+        self.fingerprint = run_fingerprint(role, ideal_persona, model)
+
+    def matches_previous(self) -> bool:
+        """True if the last checkpointed run had the same role, persona and model."""
+        run = self.store.get_run(self.run_id)
+        return bool(run) and run["fingerprint"] == self.fingerprint
+
+    def completed(self) -> Dict[str, dict]:
+        """candidate_id -> result for candidates already assessed successfully in this run."""
+        if not self.matches_previous():
+            return {}
+        return {
+            r["candidate_id"]: r for r in self.store.assessments(self.run_id)
+            if r.get("candidate_id") and "AI Error" not in (r.get("risk_flags") or [])
+        }
+
+    def start(self):
+        """Record the fingerprint of the run that is about to write results."""
+        self.store.set_fingerprint(self.run_id, self.fingerprint)
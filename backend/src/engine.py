@@ -0,0 +1,172 @@
+import os
+import time
+import heapq
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, List, Optional, Tuple
+from .models import CandidateProfile, CandidateAssessment
+from .agent import HiringAgent
+
+# ─── ANALYSIS CONCURRENCY ───────────────────────────────────────────────
+# Upper bound on assessments in flight (the shared adaptive limiter decides how
+# many actually call the LLM at once), and how long a single candidate may take,
+# retries and backoff included. Override via env or CLI (--concurrency).
+MAX_CONCURRENT_ASSESSMENTS = int(os.getenv("MAX_CONCURRENT_ASSESSMENTS", "16"))
+ASSESSMENT_TIMEOUT = float(os.getenv("ASSESSMENT_TIMEOUT", "45"))
+# Candidates packed into one LLM request (1 = one request per candidate).
+ASSESSMENT_BATCH_SIZE = int(os.getenv("ASSESSMENT_BATCH_SIZE", "1"))
+# Model cascade: re-assess borderline cheap-model scores with a larger model.
+ESCALATION_MODEL = os.getenv("ESCALATION_MODEL", "llama-3.3-70b")
+ESCALATION_BAND = (
+    int(os.getenv("ESCALATION_BAND_LOW", "40")),
+    int(os.getenv("ESCALATION_BAND_HIGH", "75")),
+)
+# ────────────────────────────────────────────────────────────────────────
+
+
+class AssessmentEngine:
+    """
+    Bounded-concurrency runner for HiringAgent.assess_candidate.
+    Keeps at most `concurrency` LLM calls in flight, applies a per-candidate
+    deadline (retries included) and returns assessments in the same order as
+    the input list.
+    With `batch_size` > 1 each in-flight call assesses a whole batch via
+    HiringAgent.assess_batch.
+    """
+    def __init__(self, agent: HiringAgent, concurrency: int = MAX_CONCURRENT_ASSESSMENTS, timeout: float = ASSESSMENT_TIMEOUT, batch_size: int = ASSESSMENT_BATCH_SIZE):
+        self.agent = agent
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.batch_size = max(1, batch_size)
+
+    def run(
+        self,
+        candidates: List[CandidateProfile],
+        role_description: str,
+        ideal_persona: str = None,
+        on_result: Optional[Callable[[int, CandidateAssessment], None]] = None,
+        priorities: Optional[List[float]] = None,
+        stop_after_tier1: int = 0,
+    ) -> List[CandidateAssessment]:
+        """
+        Assess all candidates concurrently.
+        `on_result(done_count, assessment)` is called as each one finishes (completion order).
+        `priorities` (one cheap pre-score per candidate, higher first) decides the order
+        candidates are sent to the LLM, so the most promising are published first.
+        With `stop_after_tier1` = K, candidates not yet started are skipped once K Tier-1
+        assessments exist; the returned list then only holds the assessed candidates.
+        """
+        if not self.agent.client:
+            raise ValueError("❌ Cerebras API Key is missing. Cannot perform AI analysis.")
+        if not candidates:
+            return []
+
+        print(f"⚡ Assessing {len(candidates)} candidates with {self.concurrency} concurrent calls (batch size {self.batch_size})...")
+        started = time.monotonic()
+        results: List[Optional[CandidateAssessment]] = [None] * len(candidates)
+
+        # Priority queue: highest pre-score first, ties keep input order. Only a couple of
+        # batches per worker are handed to the pool at a time, so the queue order is
+        # respected and an early stop leaves the rest untouched.
+        heap = [(-(priorities[i] if priorities else 0), i) for i in range(len(candidates))]
+        heapq.heapify(heap)
+
+        def next_batch():
+            return [heapq.heappop(heap)[1] for _ in range(min(self.batch_size, len(heap)))]
+
+        done = 0
+        tier1 = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            in_flight = {}
+
+            def fill():
+                while heap and len(in_flight) < self.concurrency * 2:
+                    batch = next_batch()
+                    in_flight[pool.submit(self._assess_batch, [candidates[i] for i in batch], role_description, ideal_persona)] = batch
+
+            try:
+                fill()
+                while in_flight:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        for i, assessment in zip(in_flight.pop(future), future.result()):
+                            results[i] = assessment
+                            done += 1
+                            tier1 += assessment.tier == 1
+                            if on_result:
+                                on_result(done, assessment)
+                    if stop_after_tier1 and tier1 >= stop_after_tier1:
+                        # Batches still queued in the pool are skipped too; only running ones finish
+                        cancelled = [f for f in in_flight if f.cancel()]
+                        skipped = len(heap) + sum(len(in_flight.pop(f)) for f in cancelled)
+                        if skipped:
+                            print(f"🏁 {tier1} Tier-1 candidates found. Skipping {skipped} remaining candidates.")
+                        heap.clear()
+                    fill()
+            except BaseException:
+                # Cancelled job or failing callback: don't pay for queued batches nobody will read
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        print(f"⏱️  Assessed {done} candidates in {time.monotonic() - started:.1f}s")
+        return [r for r in results if r is not None]
+
+    def _assess_batch(self, batch: List[CandidateProfile], role_description: str, ideal_persona: str) -> List[CandidateAssessment]:
+        print(f"   👉 Assessing: {', '.join(c.name for c in batch)}...")
+        try:
+            if len(batch) == 1:
+                return [self.agent.assess_candidate(batch[0], role_description=role_description, ideal_persona=ideal_persona, timeout=self.timeout)]
+            # A batch response is much longer, so give it more time
+            return self.agent.assess_batch(batch, role_description=role_description, ideal_persona=ideal_persona, timeout=self.timeout * 2)
+        except Exception as e:
+            # Never let one worker take down the whole pool
+            print(f"   ❌ Assessment worker error: {e}")
+            return [self.agent._fallback_assessment(c, e) for c in batch]
+
+
+def needs_escalation(assessment: CandidateAssessment, band: Tuple[int, int]) -> bool:
+    """Borderline score, or the cheap model's output failed validation (fallback result)."""
+    if "AI Error" in assessment.risk_flags:
+        return True
+    low, high = band
+    return low <= assessment.overall_score <= high
+
+
+class CascadeEngine:
+    """
+    Two-tier model cascade. Every candidate is assessed by `fast` (a cheap model);
+    only those whose score lands in `band` or whose output failed are re-assessed
+    by `strong` (a larger model). Each result's `model_used` records which tier produced it.
+    """
+    def __init__(self, fast: AssessmentEngine, strong: AssessmentEngine, band: Tuple[int, int] = ESCALATION_BAND):
+        self.fast = fast
+        self.strong = strong
+        self.band = band
+
+    def run(
+        self,
+        candidates: List[CandidateProfile],
+        role_description: str,
+        ideal_persona: str = None,
+        on_result: Optional[Callable[[int, CandidateAssessment], None]] = None,
+        on_escalated: Optional[Callable[[int, int, CandidateAssessment], None]] = None,
+        **fast_kwargs,
+    ) -> List[CandidateAssessment]:
+        """`fast_kwargs` (priorities, stop_after_tier1) apply to the cheap first pass."""
+        results = self.fast.run(candidates, role_description, ideal_persona, on_result=on_result, **fast_kwargs)
+        escalate = [i for i, a in enumerate(results) if needs_escalation(a, self.band)]
+        if not escalate:
+            return results
+
+        by_id = {c.id: c for c in candidates}
+        print(f"🪜 Escalating {len(escalate)}/{len(results)} borderline candidates to {self.strong.agent.model}...")
+
+        def escalated(done, assessment):
+            if on_escalated:
+                on_escalated(done, len(escalate), assessment)
+
+        strong_results = self.strong.run([by_id[results[i].candidate_id] for i in escalate], role_description, ideal_persona, on_result=escalated)
+        for i, assessment in zip(escalate, strong_results):
+            # Keep the cheap result if the strong model failed outright
+            if "AI Error" not in assessment.risk_flags or "AI Error" in results[i].risk_flags:
+                results[i] = assessment
+        return results
@@ -0,0 +1,214 @@
+"""
+In-process job runner for pipeline stages.
+
+The API server submits stages here instead of spawning a `python -m src.main`
+interpreter per click. Jobs run on a bounded thread pool inside the server
+process and reuse its warm Apify and LLM clients. Each job gets an ID that
+can be used to read its status or cancel it. Only one job may be queued or
+running per run, so two clicks can no longer start two pipelines that
+overwrite each other's data.
+
+Cancellation is cooperative: a cancelled in-process job stops at its next
+progress update (every status write). Set JOB_ISOLATION=process to run each
+job in its own interpreter instead, as before; cancelling one of those
+terminates the process.
+"""
+
+import os
+import sys
+import uuid
+import threading
+import subprocess
+import datetime
+from datetime import timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from .storage import DEFAULT_RUN_ID, get_store
+
+# ─── JOB RUNNER CONFIGURATION ───────────────────────────────────────────
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))            # stages (across all runs) running at once
+JOB_ISOLATION = os.getenv("JOB_ISOLATION", "thread")        # "thread" (in-process) or "process"
+JOB_HISTORY = 100                                           # finished jobs kept for /jobs
+JOB_LOG_PATH = "analysis.log"                               # stage output in process mode
+# ────────────────────────────────────────────────────────────────────────
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_context = threading.local()
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a cancelled job at its next cancellation point. A
+    BaseException (like KeyboardInterrupt) so the stages' own
+    `except Exception` error handling doesn't swallow it.
+    """
+
+
+class JobConflict(Exception):
+    """A job is already queued or running for this run."""
+    def __init__(self, job: "Job"):
+        super().__init__(f"Job {job.id} ({job.stage}) is already {job.status} for this run.")
+        self.job = job
+
+
+def check_cancelled():
+    """Raise JobCancelled if the job running on this thread was cancelled; no-op outside jobs."""
+    event = getattr(_context, "cancel_event", None)
+    if event is not None and event.is_set():
+        raise JobCancelled()
+
+
+def _now() -> str:
+    return datetime.datetime.now(timezone.utc).isoformat()
+
+
+class Job:
+    def __init__(self, stage: str, argv: List[str], run_id: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.stage = stage
+        self.argv = argv
+        self.run_id = run_id
+        self.status = "queued"  # queued | running | done | failed | cancelled
+        self.error: Optional[str] = None
+        self.created_at = _now()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.process: Optional[subprocess.Popen] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "stage": self.stage,
+            "run_id": self.run_id,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    def __init__(self, max_workers: int = JOB_WORKERS, isolation: str = JOB_ISOLATION, sourcer=None, llm_client=None):
+        if isolation not in ("thread", "process"):
+            raise ValueError(f"JOB_ISOLATION must be 'thread' or 'process', not {isolation!r}")
+        self.isolation = isolation
+        # Warm clients handed to every in-process stage
+        self.sourcer = sourcer
+        self.llm_client = llm_client
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+
+    def active_job(self, run_id: str = DEFAULT_RUN_ID) -> Optional[Job]:
+        with self._lock:
+            return next((j for j in self._jobs.values() if j.run_id == run_id and j.status in ACTIVE_STATUSES), None)
+
+    def submit(self, stage: str, argv: List[str], run_id: str = DEFAULT_RUN_ID, status: Optional[tuple] = None) -> Job:
+        """
+        Queue a stage (`argv` as for `python -m src.main`). `status` is an initial
+        (stage, message) written before the job can start, so it never overwrites
+        the job's own progress. Raises JobConflict if the run already has a job.
+        """
+        with self._lock:
+            active = next((j for j in self._jobs.values() if j.run_id == run_id and j.status in ACTIVE_STATUSES), None)
+            if active:
+                raise JobConflict(active)
+            job = Job(stage, argv, run_id)
+            self._jobs[job.id] = job
+            self._prune()
+            if status:
+                get_store().set_status(run_id, *status)
+            job.future = self._pool.submit(self._run, job)
+        print(f"🧵 Job {job.id} queued: {stage} ({self.isolation})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if not job or job.status not in ACTIVE_STATUSES:
+            return job
+        job.cancel_event.set()
+        if job.future and job.future.cancel():
+            # Never started
+            self._finish(job, "cancelled")
+        elif job.process and job.process.poll() is None:
+            job.process.terminate()
+        return job
+
+    def shutdown(self):
+        for job in self.list():
+            self.cancel(job.id)
+        self._pool.shutdown(wait=False)
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.status not in ACTIVE_STATUSES]
+        for job in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del self._jobs[job.id]
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        job.finished_at = _now()
+        if status == "cancelled":
+            get_store().set_status(job.run_id, "error", f"{job.stage.capitalize()} cancelled.")
+        elif status == "failed":
+            # Stages report their own failures; this covers errors raised before they could
+            current = get_store().get_status(job.run_id) or {}
+            if current.get("stage") != "error":
+                get_store().set_status(job.run_id, "error", f"{job.stage.capitalize()} failed: {error}")
+        print(f"🧵 Job {job.id} {status}{f': {error}' if error else ''}")
+
+    def _run(self, job: Job):
+        if job.cancel_event.is_set():
+            self._finish(job, "cancelled")
+            return
+        job.status = "running"
+        job.started_at = _now()
+        try:
+            if self.isolation == "process":
+                self._run_process(job)
+            else:
+                self._run_in_thread(job)
+            self._finish(job, "done")
+        except JobCancelled:
+            self._finish(job, "cancelled")
+        except (Exception, SystemExit) as e:
+            # SystemExit: argparse rejecting the job's arguments
+            self._finish(job, "failed", str(e) or type(e).__name__)
+
+    def _run_in_thread(self, job: Job):
+        # Imported here: the stage module imports this one for check_cancelled
+        from . import main as stages
+        args = stages.build_parser().parse_args(job.argv)
+        _context.cancel_event = job.cancel_event
+        try:
+            stages.run_stage(args, sourcer=self.sourcer, llm_client=self.llm_client)
+        finally:
+            _context.cancel_event = None
+
+    def _run_process(self, job: Job):
+        env = os.environ.copy()
+        env["PYTHONIOENCODING"] = "utf-8"
+        with open(JOB_LOG_PATH, "a", encoding="utf-8") as log_file:
+            log_file.write(f"\n\n--- Job {job.id}: {job.stage} ---\n")
+            log_file.flush()
+            job.process = subprocess.Popen([sys.executable, "-m", "src.main"] + job.argv, stdout=log_file, stderr=log_file, env=env)
+            if job.cancel_event.is_set():
+                # Cancelled while the process was being spawned
+                job.process.terminate()
+            returncode = job.process.wait()
+        if job.cancel_event.is_set():
+            raise JobCancelled()
+        if returncode != 0:
+            raise RuntimeError(f"Stage process exited with code {returncode}")
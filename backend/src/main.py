@@ -1,8 +1,7 @@
 import argparse
-import json
 import os
 from dotenv import load_dotenv
-from typing import List
+from typing import List, Optional
 
 # Load env vars from .env file
 from pathlib import Path
@@ -17,54 +16,100 @@ if not os.getenv("CEREBRAS_API_KEY"):
     print("⚠️  WARNING: CEREBRAS_API_KEY not found in environment!")
 
 from .models import CandidateProfile
-from .sourcing import SourcingEngine
+from .sourcing import SourcingEngine, SENIORITY_SHARDS
 from .agent import HiringAgent
+from .cache import AssessmentCache
+from .results_log import ResultsWriter, read_results
+from .saved_searches import SavedSearchIndex, search_key, merge_by_id
+from .checkpoint import RunCheckpoint
+from .storage import get_store, DEFAULT_RUN_ID
+from .pipeline import StreamingPipeline
+from .prerank import prerank_candidates, PRERANK_TOP_K, PRERANK_MIN_SCORE, PIPELINE_MIN_MATCH
+from .engine import (
+    AssessmentEngine, CascadeEngine,
+    MAX_CONCURRENT_ASSESSMENTS, ASSESSMENT_TIMEOUT, ASSESSMENT_BATCH_SIZE, ESCALATION_MODEL, ESCALATION_BAND,
+)
 from .google_sheets import GoogleSheetsExporter
+from .jobs import check_cancelled
 
-def write_status(stage: str, message: str):
-    """Write pipeline status to a JSON file for frontend polling."""
-    import datetime
-    from datetime import timezone
-    status = {"stage": stage, "message": message, "timestamp": datetime.datetime.now(timezone.utc).isoformat()}
-    with open("pipeline_status.json", "w", encoding="utf-8") as f:
-        json.dump(status, f, indent=2)
+def write_status(run_id: str, stage: str, message: str):
+    """Record the run's pipeline status in the store for frontend polling."""
+    # Every progress update doubles as a cancellation point for in-process jobs
+    check_cancelled()
+    get_store().set_status(run_id, stage, message)
 
 
-def stage_source(args):
+def clear_pipeline_state(run_id: str):
+    """Safety: Clear ALL old data of this run immediately to prevent data leakage. Other runs are untouched."""
+    get_store().clear_run(run_id)
+
+
+def load_persona(args) -> Optional[str]:
+    """Persona text from the --persona file, else the one saved with the run by the server."""
+    if args.persona and os.path.exists(args.persona):
+        with open(args.persona, "r", encoding='utf-8') as f:
+            return f.read()
+    return get_store().get_persona(args.run_id)
+
+
+def stage_source(args, sourcer: Optional[SourcingEngine] = None):
     """STAGE 1: Source candidates from LinkedIn (Now with Full Profiles!)."""
-    # Safety: Clear ALL old pipeline data immediately to prevent data leakage
-    files_to_clear = [
-        "sourced_candidates.json", 
-        "ranked_candidates.json", 
-        "deep_scraped_candidates.json", 
-        "results.json"
-    ]
-    for f_path in files_to_clear:
-        if os.path.exists(f_path):
-            try:
-                os.remove(f_path)
-                with open(f_path, "w", encoding="utf-8") as f:
-                    json.dump([], f)
-            except Exception as e:
-                print(f"⚠️ Warning: Could not clear {f_path}: {e}")
-
-    sourcer = SourcingEngine()
+    key = search_key(args.role, args.location)
+    store = get_store()
+    previous = store.get_delta(args.run_id) or {}
+    base_run_id = args.run_id
+    if args.incremental and previous.get("search") != key:
+        # A new run of a repeated search builds on the latest run of that search
+        base_run_id, previous = store.latest_delta(key) or (args.run_id, {})
+    # Incremental runs build on the previous results of the SAME saved search only
+    incremental = args.incremental and previous.get("search") == key
+    store.start_run(args.run_id, args.role, args.location)
+
+    sourcer = sourcer or SourcingEngine()
+    saved_searches = SavedSearchIndex()
 
     try:
-        write_status("sourcing", f"Searching for '{args.role}'...")
+        write_status(args.run_id, "sourcing", f"Searching for '{args.role}'...")
         print(f"SEARCH: Searching for '{args.role}' in '{args.location}'...")
-        candidates = sourcer.search_candidates(role=args.role, location=args.location, limit=args.search_depth)
-        
-        sourced_data = [c.model_dump() for c in candidates]
-        with open("sourced_candidates.json", "w", encoding="utf-8") as f:
-            json.dump(sourced_data, f, indent=2)
-        
-        # Optimization: Since we already have full profiles, we can "pre-fill" the deep scrape stage
-        with open("deep_scraped_candidates.json", "w", encoding="utf-8") as f:
-            json.dump(sourced_data, f, indent=2)
+        if args.shards:
+            shards = SENIORITY_SHARDS if args.shards == "seniority" else [x.strip() for x in args.shards.split(",") if x.strip()]
+            shard_by = "keyword" if args.shards == "seniority" else args.shard_by
+            candidates = sourcer.search_candidates_sharded(role=args.role, location=args.location, shards=shards, shard_by=shard_by)
+        else:
+            candidates = sourcer.search_candidates(role=args.role, location=args.location, limit=args.search_depth)
+
+        # Only now that the search succeeded is the run's previous data replaced
+        if not incremental:
+            clear_pipeline_state(args.run_id)
+        elif base_run_id != args.run_id:
+            print(f"DELTA: Building on run '{base_run_id}' of the same search.")
+            store.copy_run_data(base_run_id, args.run_id)
+
+        if incremental:
+            # Only new or changed profiles are surfaced; merge them into what we already have
+            fresh = saved_searches.delta(args.role, args.location, candidates)
+            # Upsert by id: changed profiles are replaced in place, new ones appended
+            store.put_candidates(args.run_id, [c.model_dump() for c in fresh])
+            sourced_data = store.candidates(args.run_id)
+            print(f"DELTA: {len(fresh)} new or changed of {len(candidates)} Open-to-Work profiles.")
+        else:
+            fresh = candidates
+            sourced_data = [c.model_dump() for c in candidates]
+            # Search results are already full profiles, so they double as the deep-scraped set
+            store.put_candidates(args.run_id, sourced_data, replace=True)
+        saved_searches.remember(args.role, args.location, candidates)
+        ids = [c.id for c in fresh]
+        if incremental:
+            # Ids sourced earlier but not analyzed yet stay pending until stage_analyze consumes them
+            fresh_ids = set(ids)
+            ids = [i for i in previous.get("ids", []) if i not in fresh_ids] + ids
+        store.set_delta(args.run_id, {"search": key, "ids": ids})
 
         print(f"DONE: Found {len(candidates)} candidates.")
-        write_status("sourcing_done", f"Sourcing complete. {len(candidates)} full profiles found. No deep-scrape needed!")
+        if incremental:
+            write_status(args.run_id, "sourcing_done", f"Sourcing complete. {len(fresh)} new or changed profiles (of {len(candidates)}), {len(ids)} ready to analyze.")
+        else:
+            write_status(args.run_id, "sourcing_done", f"Sourcing complete. {len(candidates)} full profiles found. No deep-scrape needed!")
 
         # Export sourced candidates to Google Sheets (scores will be empty until analysis)
         try:
@@ -80,46 +125,110 @@ def stage_source(args):
     except Exception as e:
         error_msg = str(e)
         print(f"ERROR: Sourcing Failed: {error_msg}")
-        write_status("error", f"Sourcing Failed: {error_msg}")
+        write_status(args.run_id, "error", f"Sourcing Failed: {error_msg}")
+        # Let the caller (job runner / exit code) see the failure too
+        raise
 
 
-def stage_analyze(args):
+def stage_analyze(args, llm_client=None):
     """STAGE 2: Final AI assessment on sourced candidates."""
-    # Safety: Clear own results
-    if os.path.exists("results.json"):
-        try:
-            os.remove("results.json")
-            with open("results.json", "w", encoding="utf-8") as f: json.dump([], f)
-        except: pass
-
-    if not os.path.exists("sourced_candidates.json"):
-        write_status("error", "No sourced candidates. Run Sourcing first.")
-        print("❌ sourced_candidates.json not found. Run sourcing first.")
-        return
-
-    with open("sourced_candidates.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = get_store().candidates(args.run_id)
+    if not data:
+        write_status(args.run_id, "error", "No sourced candidates. Run Sourcing first.")
+        print("❌ No sourced candidates in the pipeline store. Run sourcing first.")
+        raise RuntimeError("No sourced candidates. Run Sourcing first.")
 
     candidates = [CandidateProfile(**c) for c in data]
+
+    # Incremental: only analyze the new/changed profiles from the last delta sourcing run
+    previous_results = []
+    delta = get_store().get_delta(args.run_id) if args.incremental else None
+    if delta:
+        delta_ids = set(delta.get("ids", []))
+        previous_results = [r for r in read_results(run_id=args.run_id) if r.get("candidate_id") not in delta_ids]
+        candidates = [c for c in candidates if c.id in delta_ids]
+        print(f"DELTA: {len(candidates)} new or changed candidates; keeping {len(previous_results)} existing results.")
     print(f"🧠 STAGE 2: Final AI assessment on {len(candidates)} candidates...")
 
-    persona_text = None
-    if args.persona and os.path.exists(args.persona):
-        with open(args.persona, "r", encoding='utf-8') as f:
-            persona_text = f.read()
+    persona_text = load_persona(args)
+
+    cache = None if args.no_cache else AssessmentCache()
+    try:
+        _analyze_candidates(args, data, candidates, previous_results, persona_text, cache, llm_client)
+    finally:
+        if cache:
+            cache.close()
+
+
+def _analyze_candidates(args, data: List[dict], candidates: List[CandidateProfile], previous_results: List[dict], persona_text: Optional[str], cache: Optional[AssessmentCache], llm_client=None):
+    """Pre-rank, assess, publish and export for stage_analyze; the caller owns `cache`."""
+    pre_scores = {}
+    if args.prerank_top_k or args.prerank_min_score or args.priority == "lexical":
+        ranked = prerank_candidates(candidates, args.role, persona_text, top_k=args.prerank_top_k, min_score=args.prerank_min_score)
+        if len(ranked) < len(candidates):
+            print(f"🔎 Lexical pre-rank kept {len(ranked)}/{len(candidates)} candidates for AI assessment.")
+        candidates = [c for _, c in ranked]
+        pre_scores = {c.id: score for score, c in ranked}
+
+    agent = HiringAgent(cache=cache, client=llm_client)
+
+    # Resume: skip candidates already assessed for this role + persona + model
+    checkpoint = RunCheckpoint(args.role, persona_text, agent.model, run_id=args.run_id)
+    completed = checkpoint.completed() if args.resume else {}
+    all_candidates = candidates
+    if completed:
+        candidates = [c for c in all_candidates if c.id not in completed]
+        print(f"⏩ Resuming: {len(all_candidates) - len(candidates)} already assessed, {len(candidates)} remaining.")
+    elif args.resume:
+        print("⏩ Nothing to resume for this role/persona/model. Starting fresh.")
+
+    if args.priority == "quick_filter":
+        write_status(args.run_id, "analyzing", f"Pre-scoring {len(candidates)} headlines to prioritise analysis...")
+        pre_scores = {c.id: score for score, c in agent.quick_filter(candidates, args.role, limit=len(candidates), ideal_persona=persona_text)}
+
+    write_status(args.run_id, "analyzing", f"AI analyzing {len(candidates)} candidates...")
+
+    # Safety: Clear own results (unless resuming); new ones are streamed in as they complete
+    writer = ResultsWriter(run_id=args.run_id, reset=not (completed or previous_results))
+    checkpoint.start()
+    engine = AssessmentEngine(agent, concurrency=args.concurrency, timeout=args.timeout, batch_size=args.batch_size)
 
-    agent = HiringAgent()
-    write_status("analyzing", f"AI analyzing {len(candidates)} candidates...")
+    def on_result(done, assessment):
+        writer.append(assessment.model_dump())
+        write_status(args.run_id, "analyzing", f"Assessed {done}/{len(candidates)}: {assessment.candidate_name}...")
 
-    results = []
-    for i, candidate in enumerate(candidates):
-        write_status("analyzing", f"Assessing {i+1}/{len(candidates)}: {candidate.name}...")
-        print(f"   👉 Assessing: {candidate.name}...")
-        assessment = agent.assess_candidate(candidate, role_description=args.role, ideal_persona=persona_text)
-        results.append(assessment.model_dump())
+    run_kwargs = {"stop_after_tier1": args.stop_after_tier1}
+    if args.priority != "none":
+        # Most promising candidates are assessed (and streamed to the UI) first
+        run_kwargs["priorities"] = [pre_scores.get(c.id, 0) for c in candidates]
+    if args.cascade:
+        # Cheap model for everyone, larger model only for the borderline band
+        strong_agent = HiringAgent(model=args.escalation_model, cache=cache, client=llm_client)
+        strong = AssessmentEngine(strong_agent, concurrency=args.concurrency, timeout=args.timeout, batch_size=args.batch_size)
+        engine = CascadeEngine(engine, strong, band=(args.band_low, args.band_high))
 
-    with open("results.json", "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2)
+        def on_escalated(done, total, assessment):
+            # Later log entries win, so the escalated result replaces the cheap one
+            writer.append(assessment.model_dump())
+            write_status(args.run_id, "analyzing", f"Re-assessing borderline {done}/{total} with {args.escalation_model}: {assessment.candidate_name}...")
+        run_kwargs["on_escalated"] = on_escalated
+
+    try:
+        assessments = engine.run(candidates, role_description=args.role, ideal_persona=persona_text, on_result=on_result, **run_kwargs)
+    except Exception:
+        writer.close()
+        raise
+    new_results = {a.candidate_id: a.model_dump() for a in assessments}
+    # Sourced order; candidates skipped by an early stop have no result
+    results = [completed.get(c.id) or new_results[c.id] for c in all_candidates if c.id in completed or c.id in new_results]
+    if previous_results:
+        # Merge into the existing ranking
+        results = sorted(merge_by_id(previous_results, results, "candidate_id"), key=lambda r: r.get("overall_score", 0), reverse=True)
+    writer.close(final_results=results)
+    pending = get_store().get_delta(args.run_id)
+    if pending and pending.get("ids"):
+        # The delta is consumed only once it has been analyzed, so the next sourcing starts a new one
+        get_store().set_delta(args.run_id, {**pending, "ids": []})
 
     # Export to Google Sheets with scores
     try:
@@ -132,29 +241,108 @@ def stage_analyze(args):
     except Exception as e:
         print(f"⚠️ Google Sheets export (analysis) skipped: {e}")
 
-    print(f"✨ DONE! {len(results)} candidates analyzed. Saved to results.json")
-    write_status("done", f"Analysis complete! {len(results)} candidates assessed.")
+    print(f"📡 LLM calls: {agent.resilience.metrics.summary()}")
+    print(f"🚦 LLM rate limiter: {agent.limiter.stats()}")
+    print(f"✂️  Prompt experience tokens (raw -> compact): {agent.prompt_stats.summary()}")
+    if cache:
+        print(f"💾 Assessment cache: {cache.stats()}")
 
+    print(f"✨ DONE! {len(results)} candidates analyzed. Saved to {get_store().path}")
+    write_status(args.run_id, "done", f"Analysis complete! {len(results)} candidates assessed.")
 
-def main():
+
+def stage_pipeline(args, sourcer: Optional[SourcingEngine] = None, llm_client=None):
+    """STAGES 1+2 STREAMED: source, filter, pre-score and assess in one overlapping pass."""
+    clear_pipeline_state(args.run_id)
+    get_store().start_run(args.run_id, args.role, args.location)
+
+    persona_text = load_persona(args)
+
+    cache = None if args.no_cache else AssessmentCache()
+    agent = HiringAgent(cache=cache, client=llm_client)
+    pipeline = StreamingPipeline(
+        sourcer or SourcingEngine(), agent,
+        concurrency=args.concurrency,
+        timeout=args.timeout,
+        min_match=args.pipeline_min_match,
+        on_status=lambda msg: write_status(args.run_id, "analyzing", msg),
+        run_id=args.run_id,
+    )
+
+    try:
+        write_status(args.run_id, "sourcing", f"Streaming search for '{args.role}'...")
+        pipeline.run(args.role, args.location, ideal_persona=persona_text)
+    except Exception as e:
+        print(f"ERROR: Pipeline Failed: {e}")
+        write_status(args.run_id, "error", f"Pipeline Failed: {e}")
+        raise
+    finally:
+        if cache:
+            cache.close()
+
+    # The pipeline streamed everything into the store; read it back once for the export
+    store = get_store()
+    sourced = store.candidates(args.run_id)
+    results = store.assessments(args.run_id)
+    try:
+        exporter = GoogleSheetsExporter()
+        exporter.export_results(
+            sourced_candidates=sourced,
+            analysis_results=results,
+            role=args.role,
+        )
+    except Exception as e:
+        print(f"⚠️ Google Sheets export (pipeline) skipped: {e}")
+
+    print(f"✨ DONE! {len(sourced)} candidates sourced, {len(results)} analyzed.")
+    write_status(args.run_id, "done", f"Pipeline complete! {len(sourced)} sourced, {len(results)} assessed.")
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="AI Hiring Intelligence Agent")
-    parser.add_argument("--stage", type=str, required=True, choices=["source", "analyze"], help="Pipeline stage to run")
+    parser.add_argument("--stage", type=str, required=True, choices=["source", "analyze", "pipeline"], help="Pipeline stage to run")
     parser.add_argument("--role", type=str, required=True, help="Target job role")
     parser.add_argument("--location", type=str, default="Pakistan", help="Target location")
+    parser.add_argument("--run_id", type=str, default=DEFAULT_RUN_ID, help="Run to read and write; runs with different IDs never touch each other's data")
     parser.add_argument("--search_depth", type=int, default=50, help="Initial candidates to find via search")
     parser.add_argument("--persona", type=str, help="Path to Ideal Candidate Persona text file")
     parser.add_argument("--url", type=str, help="Individual URL to deep scrape")
+    parser.add_argument("--shards", type=str, help="Sharded search: comma-separated sub-locations/keywords, or 'seniority'")
+    parser.add_argument("--shard_by", type=str, default="location", choices=["location", "keyword"], help="How --shards values are applied to the query")
+    parser.add_argument("--incremental", action="store_true", help="Delta mode: only surface/analyze profiles that are new or changed since the last run of this search")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_ASSESSMENTS, help="Max AI assessments in flight at once")
+    parser.add_argument("--timeout", type=float, default=ASSESSMENT_TIMEOUT, help="Per-candidate AI assessment deadline in seconds, retries included")
+    parser.add_argument("--batch_size", type=int, default=ASSESSMENT_BATCH_SIZE, help="Candidates packed into one AI assessment request")
+    parser.add_argument("--prerank_top_k", type=int, default=PRERANK_TOP_K, help="Only send the top K lexically pre-ranked candidates to the AI (0 = all)")
+    parser.add_argument("--prerank_min_score", type=float, default=PRERANK_MIN_SCORE, help="Only send candidates with a pre-rank score >= this (0-100, relative to the best candidate) to the AI")
+    parser.add_argument("--pipeline_min_match", type=float, default=PIPELINE_MIN_MATCH, help="Pipeline stage: only assess profiles containing at least this share (0-100) of the query terms")
+    parser.add_argument("--priority", type=str, default="none", choices=["none", "lexical", "quick_filter"], help="Cheap pre-score used to assess the most promising candidates first")
+    parser.add_argument("--stop_after_tier1", type=int, default=0, help="Stop analysis early once this many Tier-1 candidates exist (0 = never)")
+    parser.add_argument("--cascade", action="store_true", help="Assess with the default model, then re-assess borderline scores with --escalation_model")
+    parser.add_argument("--escalation_model", type=str, default=ESCALATION_MODEL, help="Larger model used for borderline candidates in --cascade mode")
+    parser.add_argument("--band_low", type=int, default=ESCALATION_BAND[0], help="Lowest overall_score that counts as borderline in --cascade mode")
+    parser.add_argument("--band_high", type=int, default=ESCALATION_BAND[1], help="Highest overall_score that counts as borderline in --cascade mode")
+    parser.add_argument("--resume", action="store_true", help="Skip candidates already assessed by an interrupted run with the same role/persona/model")
+    parser.add_argument("--no_cache", action="store_true", help="Bypass the on-disk assessment cache")
+    return parser
 
-    args = parser.parse_args()
 
+def run_stage(args, sourcer: Optional[SourcingEngine] = None, llm_client=None):
+    """Run the stage named by args.stage, reusing the given clients when called in-process."""
     if args.stage == "source":
-        stage_source(args)
+        stage_source(args, sourcer=sourcer)
     elif args.stage == "rank":
         stage_rank(args)
     elif args.stage == "deep-scrape":
         stage_deep_scrape(args)
     elif args.stage == "analyze":
-        stage_analyze(args)
+        stage_analyze(args, llm_client=llm_client)
+    elif args.stage == "pipeline":
+        stage_pipeline(args, sourcer=sourcer, llm_client=llm_client)
+
+
+def main():
+    run_stage(build_parser().parse_args())
 
 
 if __name__ == "__main__":
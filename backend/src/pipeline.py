@@ -0,0 +1,195 @@
+"""
+Single streaming sourcing-to-analysis pipeline.
+
+    Apify dataset items -> map + OTW filter -> lexical pre-score -> LLM assess -> export
+
+Each arrow is a bounded queue, and each stage runs in its own thread (assessment
+in several). Stages overlap: the first candidates are being assessed while the
+search actor is still producing items. When a downstream stage falls behind,
+the full queue blocks the upstream one. Profiles and assessments go straight
+to the pipeline store and are not kept in memory, so memory stays flat however
+deep the search goes.
+
+The pre-score stage is a filter only: with `min_match` set it drops candidates
+whose match_score (the share of query terms in the profile, 0-100) is below
+it, otherwise candidates pass through unscored. Unlike the batch pre-rank
+score this is absolute, as there are no other candidates to compare against. A stream has no full candidate list to reorder, so
+assessment order is arrival order.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+from .sourcing import SourcingEngine
+from .agent import HiringAgent
+from .prerank import match_score, PIPELINE_MIN_MATCH
+from .results_log import ResultsWriter
+from .storage import PipelineStore, DEFAULT_RUN_ID, get_store
+from .engine import ASSESSMENT_TIMEOUT, MAX_CONCURRENT_ASSESSMENTS
+
+QUEUE_SIZE = 64
+SOURCED_FLUSH_EVERY = 25
+
+_DONE = object()  # end-of-stream marker passed down every queue
+
+
+class StreamingPipeline:
+    def __init__(
+        self,
+        sourcer: SourcingEngine,
+        agent: HiringAgent,
+        concurrency: int = MAX_CONCURRENT_ASSESSMENTS,
+        timeout: float = ASSESSMENT_TIMEOUT,
+        min_match: float = PIPELINE_MIN_MATCH,
+        on_status: Optional[Callable[[str], None]] = None,
+        store: Optional[PipelineStore] = None,
+        run_id: str = DEFAULT_RUN_ID,
+    ):
+        self.sourcer = sourcer
+        self.agent = agent
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.min_match = min_match
+        self.on_status = on_status or (lambda msg: None)
+        self.store = store or get_store()
+        self.run_id = run_id
+
+        self.items: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.profiles: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.scored: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.assessed: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+
+        self.counts = {"items": 0, "otw": 0, "skipped_prescore": 0, "assessed": 0}
+        self.errors: List[str] = []
+        self._stopping = threading.Event()
+
+    def run(self, role: str, location: str, ideal_persona: str = None) -> dict:
+        """Runs all stages to completion and returns the counts; results are in the store."""
+        query = f"{role} {ideal_persona or ''}"
+        writer = ResultsWriter(self.store, self.run_id)
+        started = time.monotonic()
+
+        threads = [
+            threading.Thread(target=self._guard, args=(self._source, role, location), name="pipeline-source"),
+            threading.Thread(target=self._guard, args=(self._map,), name="pipeline-map"),
+            threading.Thread(target=self._guard, args=(self._prescore, query), name="pipeline-prescore"),
+        ]
+        workers = [
+            threading.Thread(target=self._guard, args=(self._assess, role, ideal_persona), name=f"pipeline-assess-{i}")
+            for i in range(self.concurrency)
+        ]
+        for t in threads + workers:
+            t.start()
+
+        # The export stage runs on the calling thread
+        finished_workers = 0
+        try:
+            while finished_workers < len(workers):
+                item = self.assessed.get()
+                if item is _DONE:
+                    finished_workers += 1
+                    continue
+                writer.append(item)
+                self.counts["assessed"] += 1
+                self.on_status(
+                    f"Streaming: {self.counts['items']} profiles scanned, {self.counts['otw']} Open-to-Work, "
+                    f"{self.counts['assessed']} assessed..."
+                )
+        except BaseException:
+            # Cancelled (on_status raised): stop sourcing, let the stages run dry without
+            # further LLM calls, and keep draining so none of them blocks on a full queue
+            self._stopping.set()
+            while finished_workers < len(workers):
+                if self.assessed.get() is _DONE:
+                    finished_workers += 1
+            raise
+
+        for t in threads + workers:
+            t.join()
+        # Results were upserted in completion order as they arrived; nothing to reorder
+        writer.close()
+
+        print(f"⏱️  Pipeline finished in {time.monotonic() - started:.1f}s: {self.counts}")
+        if self.errors:
+            raise RuntimeError("; ".join(self.errors))
+        return self.counts
+
+    def _guard(self, stage: Callable, *args):
+        """Run a stage; on failure record the error but still close the stream downstream."""
+        try:
+            stage(*args)
+        except Exception as e:
+            print(f"❌ Pipeline stage {threading.current_thread().name} failed: {e}")
+            self.errors.append(str(e))
+            self._drain_and_finish(stage)
+
+    def _drain_and_finish(self, stage: Callable):
+        # Propagate end-of-stream downstream, then keep consuming our input so
+        # the stage before us never blocks on a full queue
+        outputs = {
+            self._source: (None, self.items, 1),
+            self._map: (self.items, self.profiles, 1),
+            self._prescore: (self.profiles, self.scored, self.concurrency),
+            self._assess: (self.scored, self.assessed, 1),
+        }
+        inbox, outbox, fanout = outputs[stage]
+        for _ in range(fanout):
+            outbox.put(_DONE)
+        if inbox is not None:
+            while inbox.get() is not _DONE:
+                pass
+
+    def _source(self, role: str, location: str):
+        for item in self.sourcer.stream_search_items(role, location, stop=self._stopping):
+            if self._stopping.is_set():
+                break
+            self.items.put(item)
+        self.items.put(_DONE)
+
+    def _map(self):
+        pending: List[dict] = []  # sourced profiles not yet flushed to the store
+        while True:
+            item = self.items.get()
+            if item is _DONE:
+                break
+            self.counts["items"] += 1
+            candidate = self.sourcer.map_search_item(item)
+            if not candidate:
+                continue
+            self.counts["otw"] += 1
+            pending.append(candidate.model_dump())
+            if len(pending) >= SOURCED_FLUSH_EVERY:
+                self.store.put_candidates(self.run_id, pending)
+                pending = []
+            self.profiles.put(candidate)
+        if pending:
+            self.store.put_candidates(self.run_id, pending)
+        self.profiles.put(_DONE)
+
+    def _prescore(self, query: str):
+        while True:
+            candidate = self.profiles.get()
+            if candidate is _DONE:
+                break
+            if self.min_match and match_score(candidate, query) < self.min_match:
+                self.counts["skipped_prescore"] += 1
+                continue
+            self.scored.put(candidate)
+        for _ in range(self.concurrency):
+            self.scored.put(_DONE)
+
+    def _assess(self, role: str, ideal_persona: Optional[str]):
+        while True:
+            candidate = self.scored.get()
+            if candidate is _DONE:
+                break
+            if self._stopping.is_set():
+                continue
+            print(f"   👉 Assessing: {candidate.name}...")
+            try:
+                assessment = self.agent.assess_candidate(candidate, role_description=role, ideal_persona=ideal_persona, timeout=self.timeout)
+            except Exception as e:
+                assessment = self.agent._fallback_assessment(candidate, e)
+            self.assessed.put(assessment.model_dump())
+        self.assessed.put(_DONE)
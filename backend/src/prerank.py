@@ -0,0 +1,151 @@
+"""
+Local lexical pre-ranker (BM25) used as a cheap first stage before LLM scoring.
+
+Pure Python, no extra dependencies. Candidates are indexed on headline, about
+and experience text and scored against the role plus the ideal persona, so only
+plausible fits are sent on to HiringAgent.
+"""
+
+import os
+import re
+import json
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from .models import CandidateProfile
+
+# ─── PRE-RANK CONFIGURATION ─────────────────────────────────────────────
+# 0 / unset disables the corresponding cut-off.
+PRERANK_TOP_K = int(os.getenv("PRERANK_TOP_K", "0"))
+PRERANK_MIN_SCORE = float(os.getenv("PRERANK_MIN_SCORE", "0"))  # 0-100, relative to the best candidate
+PIPELINE_MIN_MATCH = float(os.getenv("PIPELINE_MIN_MATCH", "0"))  # 0-100, absolute match_score for the streaming pipeline
+# ────────────────────────────────────────────────────────────────────────
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the to was were will with
+we you your our they their this those these i me my he she his her them who what which when where
+experience years year work working role roles team teams company looking candidate candidates
+""".split())
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def term_counts(text: Optional[str]) -> Counter:
+    # Count first, then drop stopwords once per distinct term (much cheaper on long profiles)
+    tf = Counter(_TOKEN_RE.findall(text.lower())) if text else Counter()
+    for t in STOPWORDS.intersection(tf):
+        del tf[t]
+    return tf
+
+
+def _experience_text(experience_text: Optional[str]) -> str:
+    """Only the human-readable experience fields, so JSON keys/URLs don't pollute the index."""
+    if not experience_text:
+        return ""
+    try:
+        entries = json.loads(experience_text)
+    except (TypeError, ValueError):
+        return experience_text
+    if not isinstance(entries, list):
+        return experience_text
+    parts = []
+    for e in entries:
+        if isinstance(e, dict):
+            for key in ("position", "title", "companyName", "description"):
+                v = e.get(key)
+                if isinstance(v, str):
+                    parts.append(v)
+    return " ".join(parts)
+
+
+def candidate_text(candidate: CandidateProfile) -> str:
+    return " ".join(filter(None, [
+        candidate.headline,
+        candidate.about,
+        _experience_text(candidate.experience_text),
+    ]))
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of candidates."""
+    def __init__(self, candidates: List[CandidateProfile], k1: float = 1.5, b: float = 0.75):
+        self.candidates = candidates
+        self.k1 = k1
+        self.b = b
+        self.doc_freqs: List[Counter] = []
+        self.doc_lens: List[int] = []
+        df: Counter = Counter()
+        for c in candidates:
+            tf = term_counts(candidate_text(c))
+            self.doc_freqs.append(tf)
+            self.doc_lens.append(sum(tf.values()))
+            df.update(tf.keys())
+        n = len(candidates)
+        self.avgdl = (sum(self.doc_lens) / n) if n else 0.0
+        self.idf: Dict[str, float] = {
+            term: math.log(1 + (n - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()
+        }
+
+    def scores(self, query: str) -> List[float]:
+        terms = [t for t in set(tokenize(query)) if t in self.idf]
+        k1, b, avgdl = self.k1, self.b, self.avgdl or 1.0
+        out = []
+        for tf, dl in zip(self.doc_freqs, self.doc_lens):
+            norm = k1 * (1 - b + b * dl / avgdl)
+            s = 0.0
+            for t in terms:
+                f = tf.get(t)
+                if f:
+                    s += self.idf[t] * f * (k1 + 1) / (f + norm)
+            out.append(s)
+        return out
+
+
+def prerank_candidates(
+    candidates: List[CandidateProfile],
+    role: str,
+    ideal_persona: str = None,
+    top_k: int = PRERANK_TOP_K,
+    min_score: float = PRERANK_MIN_SCORE,
+) -> List[Tuple[float, CandidateProfile]]:
+    """
+    Score candidates locally and return (score, candidate) pairs, best first,
+    keeping only the top_k and/or those scoring at least min_score.
+    Scores are normalised to 0-100 relative to the best candidate in the pool.
+    """
+    if not candidates:
+        return []
+    raw = BM25Index(candidates).scores(f"{role} {ideal_persona or ''}")
+    best = max(raw) or 1.0
+    ranked = sorted(
+        ((round(100 * s / best, 1), c) for s, c in zip(raw, candidates)),
+        key=lambda x: x[0],
+        reverse=True,
+    )
+    if min_score:
+        ranked = [r for r in ranked if r[0] >= min_score]
+    if top_k:
+        ranked = ranked[:top_k]
+    return ranked
+
+
+def match_score(candidate: CandidateProfile, query: str) -> float:
+    """
+    Corpus-free lexical score (0-100) for streaming use, where BM25's IDF is not
+    available yet: the share of distinct query terms found in the profile, with a
+    small bonus for terms that occur in the headline.
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return 0.0
+    tf = term_counts(candidate_text(candidate))
+    headline = set(tokenize(candidate.headline))
+    hits = sum(1 for t in terms if t in tf)
+    bonus = sum(1 for t in terms if t in headline)
+    return round(min(100.0, 100.0 * (hits + 0.5 * bonus) / len(terms)), 1)
@@ -0,0 +1,93 @@
+"""
+Local store of raw HarvestAPI profile items, keyed by canonical LinkedIn URL.
+
+SourcingEngine writes every profile it pays Apify for into this SQLite file and
+serves fresh-enough profiles from it, so only missing or stale URLs go back to
+the profile actor.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, List
+from .urls import canonical_profile_url
+
+# ─── PROFILE STORE CONFIGURATION ────────────────────────────────────────
+PROFILE_STORE_PATH = os.getenv("PROFILE_STORE_PATH", "profile_store.db")
+PROFILE_MAX_AGE = float(os.getenv("PROFILE_MAX_AGE", str(7 * 24 * 3600)))  # seconds before a profile is re-scraped
+# ────────────────────────────────────────────────────────────────────────
+
+
+class ProfileStore:
+    def __init__(self, path: str = PROFILE_STORE_PATH, max_age: float = PROFILE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+        # Parallel runs and server workers share the file; wait for the write lock rather than fail
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            " url TEXT PRIMARY KEY,"
+            " item TEXT NOT NULL,"
+            " source TEXT,"
+            " fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def put_many(self, items: Iterable[dict], source: str, url_keys=("linkedinUrl", "url", "profileUrl")):
+        """Store raw items under the canonical form of their profile URL."""
+        now = time.time()
+        rows = []
+        for item in items:
+            url = canonical_profile_url(next((item.get(k) for k in url_keys if item.get(k)), None))
+            if url:
+                rows.append((url, json.dumps(item), source, now))
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO profiles (url, item, source, fetched_at) VALUES (?, ?, ?, ?)", rows
+            )
+
+    def get_fresh(self, urls: List[str]) -> Dict[str, dict]:
+        """canonical URL -> raw item for every URL stored within max_age. Updates hit/miss counters."""
+        keys = {canonical_profile_url(u) for u in urls if u}
+        keys.discard(None)
+        if not keys:
+            return {}
+        found = {}
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            key_list = list(keys)
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                sql = f"SELECT url, item, fetched_at FROM profiles WHERE url IN ({','.join('?' * len(chunk))})"
+                for url, item, fetched_at in self._conn.execute(sql, chunk):
+                    if fetched_at < cutoff:
+                        self.stale += 1
+                        continue
+                    found[url] = json.loads(item)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,143 @@
+"""
+Compact, token-budgeted rendering of candidate profiles for LLM prompts.
+
+HarvestAPI experience arrays carry URLs, logos, IDs and nested objects that the
+model never needs. This module keeps only title, company, dates, duration and
+description, and drops the least recent roles first once the budget is hit.
+"""
+
+import os
+import json
+import threading
+from typing import Any, List, Optional
+
+# ─── PROMPT BUDGET ──────────────────────────────────────────────────────
+# Hard cap (approx. tokens) for the experience section of one candidate.
+EXPERIENCE_TOKEN_BUDGET = int(os.getenv("EXPERIENCE_TOKEN_BUDGET", "600"))
+# ────────────────────────────────────────────────────────────────────────
+
+# ~4 characters per token is the usual rule of thumb for English text with
+# Llama-family tokenizers; good enough for budgeting without a tokenizer dependency.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _text(value: Any) -> str:
+    """Flatten HarvestAPI scalar-or-object fields (dates, company) into plain text."""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        if value.get("text"):
+            return str(value["text"])
+        if value.get("name"):
+            return str(value["name"])
+        parts = [str(value[k]) for k in ("month", "year") if value.get(k)]
+        return " ".join(parts)
+    return str(value).strip()
+
+
+def _render_entry(entry: dict, description_chars: Optional[int] = None) -> str:
+    title = _text(entry.get("position") or entry.get("title"))
+    company = _text(entry.get("companyName") or entry.get("company"))
+    start = _text(entry.get("startDate"))
+    end = _text(entry.get("endDate")) or ("Present" if start else "")
+    duration = _text(entry.get("duration"))
+
+    line = title or "Role"
+    if company:
+        line += f" @ {company}"
+    when = " - ".join(p for p in (start, end) if p)
+    meta = ", ".join(p for p in (when, duration) if p)
+    if meta:
+        line += f" ({meta})"
+
+    description = " ".join(_text(entry.get("description")).split())
+    if description_chars is not None:
+        description = description[:description_chars].rstrip() + ("…" if len(description) > description_chars else "")
+    if description:
+        line += f": {description}"
+    return line
+
+
+def render_experience(experience_text: Optional[str], max_tokens: int = EXPERIENCE_TOKEN_BUDGET) -> str:
+    """
+    Render `experience_text` (JSON of a HarvestAPI experience array) as one compact
+    line per role, most recent first, within `max_tokens`. Non-JSON text is simply
+    truncated to the budget.
+    """
+    if not experience_text:
+        return ""
+    try:
+        entries = json.loads(experience_text)
+    except (TypeError, ValueError):
+        entries = None
+    if not isinstance(entries, list):
+        return experience_text[:max_tokens * CHARS_PER_TOKEN]
+
+    entries = [e for e in entries if isinstance(e, dict)]
+    if not entries:
+        return ""
+    budget_chars = max_tokens * CHARS_PER_TOKEN
+    # Room kept for the "omitted" note whenever more roles follow (+1 for its newline)
+    note_reserve = len(_omitted_note(len(entries))) + 1
+    lines: List[str] = []
+    used = 0
+    for i, entry in enumerate(entries):
+        reserve = note_reserve if i < len(entries) - 1 else 0
+        line = _render_entry(entry)
+        if used + len(line) + 1 + reserve <= budget_chars:
+            lines.append(line)
+            used += len(line) + 1
+            continue
+        # Doesn't fit: keep the header and as much description as remains, then stop
+        # (everything after this role is omitted, so the note is needed if any follow)
+        header = _render_entry(entry, description_chars=0)
+        remaining = budget_chars - used - reserve - len(header) - 1 - len(": …")
+        if remaining > 40:
+            lines.append(_render_entry(entry, description_chars=remaining))
+            i += 1
+        elif not lines:
+            # Never drop the most recent role entirely: keep (a cut of) its header
+            room = budget_chars - reserve - 1
+            if room <= 0:
+                return header[:budget_chars]
+            lines.append(header if len(header) <= room else header[:room - 1].rstrip() + "…")
+            i += 1
+        omitted = len(entries) - i
+        if omitted:
+            lines.append(_omitted_note(omitted))
+        break
+    return "\n".join(lines)
+
+
+def _omitted_note(count: int) -> str:
+    return f"(+{count} earlier roles omitted)"
+
+
+class PromptStats:
+    """Thread-safe counters of experience tokens before and after compaction."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profiles = 0
+        self.raw_tokens = 0
+        self.compact_tokens = 0
+
+    def record(self, raw: str, compact: str):
+        with self._lock:
+            self.profiles += 1
+            self.raw_tokens += estimate_tokens(raw)
+            self.compact_tokens += estimate_tokens(compact)
+
+    def summary(self) -> dict:
+        saved = self.raw_tokens - self.compact_tokens
+        return {
+            "profiles": self.profiles,
+            "raw_tokens": self.raw_tokens,
+            "compact_tokens": self.compact_tokens,
+            "saved_pct": round(100 * saved / self.raw_tokens, 1) if self.raw_tokens else 0.0,
+        }
@@ -0,0 +1,157 @@
+"""
+Adaptive (AIMD) concurrency limiter for LLM calls.
+
+Concurrency grows additively while calls succeed and is cut multiplicatively
+on 429s or latency spikes, like TCP congestion control. Requests per minute
+and tokens per minute are also tracked over a sliding 60s window and held
+under configurable ceilings, so throughput settles near the provider limit
+without manual tuning.
+
+The ceilings are the provider's, not a caller's: every HiringAgent in the
+process shares the limiter from get_limiter(), so parallel jobs and the
+cascade's second model stay under one budget and a 429 slows all of them.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Optional
+
+# ─── RATE LIMIT CONFIGURATION ───────────────────────────────────────────
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "0"))   # requests/minute, 0 = no ceiling
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "0"))   # tokens/minute, 0 = no ceiling
+# ────────────────────────────────────────────────────────────────────────
+
+WINDOW = 60.0
+DECREASE_FACTOR = 0.5
+LATENCY_SPIKE_FACTOR = 3.0   # latency above 3x the moving average counts as congestion
+LATENCY_SPIKE_FLOOR = 5.0    # ...but only if it is also above this many seconds
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        min_limit: int = LLM_MIN_CONCURRENCY,
+        max_limit: int = LLM_MAX_CONCURRENCY,
+        initial: int = LLM_INITIAL_CONCURRENCY,
+        rpm_limit: int = LLM_RPM_LIMIT,
+        tpm_limit: int = LLM_TPM_LIMIT,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.in_flight = 0
+        self.decreases = 0
+        self._avg_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._window = deque()  # [timestamp, tokens] per request started in the last minute
+        self._cond = threading.Condition()
+
+    def acquire(self, tokens: int = 0, deadline: Optional[float] = None) -> list:
+        """
+        Block until a slot is free and the RPM/TPM budget allows another call.
+        Raises TimeoutError if that hasn't happened by `deadline` (a time.monotonic() value).
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                wait_for = self._budget_wait(now, tokens)
+                if self.in_flight < int(self.limit) and wait_for <= 0:
+                    break
+                timeout = wait_for if wait_for > 0 else None
+                if deadline is not None:
+                    if now >= deadline:
+                        raise TimeoutError("LLM call deadline exceeded waiting for a rate limit slot")
+                    timeout = min(timeout, deadline - now) if timeout is not None else deadline - now
+                self._cond.wait(timeout=timeout)
+            return self._take(now, tokens)
+
+    def try_acquire(self, tokens: int = 0) -> Optional[list]:
+        """A ticket if a slot and budget are free right now, else None (never blocks)."""
+        with self._cond:
+            now = time.monotonic()
+            self._expire(now)
+            if self.in_flight >= int(self.limit) or self._budget_wait(now, tokens) > 0:
+                return None
+            return self._take(now, tokens)
+
+    def _take(self, now: float, tokens: int) -> list:
+        self.in_flight += 1
+        ticket = [now, tokens]
+        self._window.append(ticket)
+        return ticket
+
+    def release(self, ticket: list, latency: float, ok: bool, throttled: bool = False, tokens: Optional[int] = None):
+        with self._cond:
+            self.in_flight -= 1
+            if tokens is not None:
+                ticket[1] = tokens  # replace the estimate with what the provider reported
+            spike = (
+                ok and self._avg_latency is not None
+                and latency > LATENCY_SPIKE_FLOOR
+                and latency > LATENCY_SPIKE_FACTOR * self._avg_latency
+            )
+            if throttled or spike:
+                self._decrease()
+            elif ok:
+                # Additive increase: about +1 per `limit` successful calls
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            if ok:
+                self._avg_latency = latency if self._avg_latency is None else 0.8 * self._avg_latency + 0.2 * latency
+            self._cond.notify_all()
+
+    def _decrease(self):
+        now = time.monotonic()
+        # One cut per congestion event: ignore signals from calls already in flight
+        if now - self._last_decrease < (self._avg_latency or 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+        self.decreases += 1
+        print(f"   🐢 LLM concurrency cut to {int(self.limit)} (rate limit / latency spike)")
+
+    def _expire(self, now: float):
+        while self._window and now - self._window[0][0] >= WINDOW:
+            self._window.popleft()
+
+    def _budget_wait(self, now: float, tokens: int) -> float:
+        """Seconds until the sliding window has room, 0 if it already does."""
+        waits = [0.0]
+        if self.rpm_limit and len(self._window) >= self.rpm_limit:
+            waits.append(self._window[0][0] + WINDOW - now)
+        if self.tpm_limit and self._window:
+            used = sum(t for _, t in self._window)
+            if used + tokens > self.tpm_limit:
+                waits.append(self._window[0][0] + WINDOW - now)
+        return max(waits)
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._expire(time.monotonic())
+            return {
+                "concurrency_limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "decreases": self.decreases,
+                "requests_last_min": len(self._window),
+                "tokens_last_min": sum(t for _, t in self._window),
+            }
+
+
+_limiter: Optional[AdaptiveLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> AdaptiveLimiter:
+    """The process-wide limiter shared by every HiringAgent, created on first use."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = AdaptiveLimiter()
+        return _limiter
@@ -0,0 +1,280 @@
+"""
+Resilience layer for Cerebras (OpenAI-compatible) chat completion calls.
+
+- Jittered exponential backoff that honours Retry-After on 429/5xx/timeouts.
+- A circuit breaker that pauses every caller while the provider is down,
+  instead of letting each one burn its retries. Like the rate limiter, one
+  breaker (get_breaker()) is shared by every HiringAgent in the process.
+- Optional hedged requests: if a call is slower than `hedge_after` seconds a
+  duplicate is fired (when the rate limiter has a free slot for it) and
+  whichever answers first wins.
+- Counters for calls, failures, retries, hedges and latency.
+"""
+
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, List, Optional
+from .ratelimit import AdaptiveLimiter
+
+# ─── RESILIENCE CONFIGURATION ───────────────────────────────────────────
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))      # seconds
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30.0"))       # seconds
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))  # consecutive failures
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30.0"))  # seconds
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))          # 0 = hedging off
+# ────────────────────────────────────────────────────────────────────────
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class CircuitOpenError(Exception):
+    """Raised when the provider stays unavailable past the breaker's patience."""
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    # No HTTP status: connection errors / timeouts from the client
+    name = type(error).__name__
+    return name in ("APIConnectionError", "APITimeoutError", "TimeoutError", "ConnectionError")
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures. While open, callers block until
+    `cooldown` has passed; then calls are let through again (half-open) and the
+    first success closes it, a failure re-opens it.
+    """
+    def __init__(self, threshold: int = LLM_BREAKER_THRESHOLD, cooldown: float = LLM_BREAKER_COOLDOWN, max_wait: float = 300.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_wait = max_wait
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.cooldown else "half-open"
+
+    def before_call(self, deadline: Optional[float] = None):
+        waited = 0.0
+        while True:
+            with self._lock:
+                if self.opened_at is None:
+                    return
+                remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining <= 0:
+                return
+            if waited + remaining > self.max_wait or (deadline is not None and time.monotonic() + remaining > deadline):
+                raise CircuitOpenError("LLM provider unavailable (circuit open)")
+            time.sleep(remaining)
+            waited += remaining
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold and (self.opened_at is None or time.monotonic() - self.opened_at >= self.cooldown):
+                if self.opened_at is None:
+                    print(f"🔌 Circuit breaker OPEN after {self.failures} consecutive LLM failures. Pausing {self.cooldown:.0f}s...")
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+
+
+class CallMetrics:
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.hedges = 0
+        self._latencies: List[float] = []
+        self._window = window
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+            if len(self._latencies) > self._window:
+                self._latencies.pop(0)
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def summary(self) -> dict:
+        with self._lock:
+            lat = sorted(self._latencies)
+        def pct(p):
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))], 2) if lat else 0.0
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "latency_p50": pct(0.5),
+            "latency_p95": pct(0.95),
+            "latency_max": round(lat[-1], 2) if lat else 0.0,
+        }
+
+
+class ResilientCaller:
+    """
+    Wraps a callable (e.g. client.chat.completions.create) with retries, breaker and hedging.
+    If a `limiter` is given, every attempt also takes a slot from it and reports back
+    its outcome so the limiter can adapt.
+    """
+    def __init__(
+        self,
+        max_attempts: int = LLM_MAX_ATTEMPTS,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_max: float = LLM_BACKOFF_MAX,
+        hedge_after: float = LLM_HEDGE_AFTER,
+        breaker: Optional[CircuitBreaker] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter
+        self.metrics = CallMetrics()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge") if hedge_after > 0 else None
+
+    def call(self, fn: Callable, *, cost: int = 0, deadline: Optional[float] = None, **kwargs):
+        """
+        Call fn(**kwargs). `cost` is the estimated token count, for the limiter's TPM budget.
+        `deadline` (time.monotonic() value) bounds the whole call, retries, backoff and
+        breaker waits included: no attempt starts after it, and a `timeout` kwarg is
+        shortened so the last attempt ends by it.
+        """
+        last_error = None
+        for attempt in range(1, self.max_attempts + 1):
+            self.breaker.before_call(deadline)
+            ticket = self.limiter.acquire(cost, deadline=deadline) if self.limiter else None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    if ticket:
+                        self.limiter.release(ticket, 0.0, ok=False)
+                    raise last_error or TimeoutError("LLM call deadline exceeded")
+                if "timeout" in kwargs:
+                    kwargs["timeout"] = min(kwargs["timeout"], remaining)
+            self.metrics.incr("calls")
+            started = time.monotonic()
+            # With hedging the request may outlive this call, so _hedged releases its ticket
+            own_ticket = None if self._hedge_pool else ticket
+            try:
+                result = self._hedged(fn, kwargs, cost, ticket) if self._hedge_pool else fn(**kwargs)
+            except Exception as e:
+                last_error = e
+                if own_ticket:
+                    self.limiter.release(own_ticket, time.monotonic() - started, ok=False, throttled=getattr(e, "status_code", None) == 429)
+                self.metrics.incr("failures")
+                if not is_retryable(e):
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_attempts:
+                    break
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    # Full jitter: uniform(0, min(cap, base * 2^attempt))
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    # No time left for another attempt
+                    break
+                self.metrics.incr("retries")
+                print(f"   🔁 LLM call failed ({type(e).__name__}), retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            latency = time.monotonic() - started
+            if own_ticket:
+                usage = getattr(result, "usage", None)
+                self.limiter.release(own_ticket, latency, ok=True, tokens=getattr(usage, "total_tokens", None))
+            self.metrics.record_latency(latency)
+            self.metrics.incr("successes")
+            self.breaker.record_success()
+            return result
+        raise last_error
+
+    def _hedged(self, fn: Callable, kwargs: dict, cost: int = 0, ticket: Optional[list] = None):
+        started = time.monotonic()
+        first = self._hedge_pool.submit(fn, **kwargs)
+        if ticket:
+            # The original request keeps its slot until it finishes, even if the hedge wins
+            first.add_done_callback(lambda f: self._release_when_done(ticket, started, f))
+        done, _ = wait([first], timeout=self.hedge_after)
+        if done:
+            return first.result()
+        # The duplicate is a real request: it needs its own limiter slot, and is
+        # skipped rather than queued when the budget has no room for it
+        hedge_ticket = None
+        if self.limiter:
+            hedge_ticket = self.limiter.try_acquire(cost)
+            if hedge_ticket is None:
+                return first.result()
+        self.metrics.incr("hedges")
+        hedge_started = time.monotonic()
+        second = self._hedge_pool.submit(fn, **kwargs)
+        if hedge_ticket:
+            second.add_done_callback(lambda f: self._release_when_done(hedge_ticket, hedge_started, f))
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _release_when_done(self, ticket: list, started: float, future):
+        # Runs when that request finishes, even if the other one already won
+        error = future.exception()
+        usage = getattr(future.result(), "usage", None) if error is None else None
+        self.limiter.release(
+            ticket, time.monotonic() - started, ok=error is None,
+            throttled=getattr(error, "status_code", None) == 429, tokens=getattr(usage, "total_tokens", None),
+        )
+
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_breaker() -> CircuitBreaker:
+    """The process-wide breaker shared by every HiringAgent, created on first use."""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker()
+        return _breaker
@@ -0,0 +1,38 @@
+"""
+Incremental results output for the analysis stage.
+
+Every finished assessment is upserted into the pipeline store straight away,
+one transaction each, and the final ordered result set is swapped in
+atomically when the run closes. A crash mid-run therefore loses at most the
+in-flight candidates, and readers never see a half-written result set.
+"""
+
+import threading
+from typing import List, Optional
+from .storage import PipelineStore, DEFAULT_RUN_ID, get_store
+
+
+def read_results(store: Optional[PipelineStore] = None, run_id: str = DEFAULT_RUN_ID) -> List[dict]:
+    """Whatever results exist so far, including those streamed in by a run still in progress."""
+    return (store or get_store()).assessments(run_id)
+
+
+class ResultsWriter:
+    """Streams assessments into the store as they finish and writes the final ordered set on close."""
+    def __init__(self, store: Optional[PipelineStore] = None, run_id: str = DEFAULT_RUN_ID, reset: bool = True):
+        self.store = store or get_store()
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        if reset:
+            self.store.clear_assessments(run_id)
+
+    def append(self, result: dict):
+        # Later entries for the same candidate win (e.g. a cascade escalation)
+        with self._lock:
+            self.store.upsert_assessment(self.run_id, result)
+
+    def close(self, final_results: Optional[List[dict]] = None):
+        """Store the final results in the caller's order, if given."""
+        if final_results is not None:
+            with self._lock:
+                self.store.replace_assessments(self.run_id, final_results)
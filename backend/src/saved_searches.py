@@ -0,0 +1,50 @@
+"""
+Saved-search memory for incremental (delta) sourcing.
+
+For each role + location we remember every Open-to-Work profile seen so far and
+a hash of its content, in the pipeline store. A daily re-run then only surfaces
+profiles that are new or whose headline / about / experience changed, and only
+those are re-analyzed. Profiles a search hasn't returned for
+SAVED_SEARCH_RETENTION_DAYS are forgotten when runs are pruned.
+"""
+
+import json
+import hashlib
+from typing import List, Optional
+from .models import CandidateProfile
+from .storage import PipelineStore, get_store
+from .urls import canonical_profile_url
+
+
+def search_key(role: str, location: str) -> str:
+    return f"{(role or '').strip().lower()}|{(location or '').strip().lower()}"
+
+
+def profile_fingerprint(candidate: CandidateProfile) -> str:
+    payload = json.dumps([candidate.headline, candidate.about, candidate.experience_text, candidate.is_open_to_work])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SavedSearchIndex:
+    def __init__(self, store: Optional[PipelineStore] = None):
+        # Kept in the pipeline database, so runs in other processes see each other's updates
+        self.store = store or get_store()
+
+    def delta(self, role: str, location: str, candidates: List[CandidateProfile]) -> List[CandidateProfile]:
+        """Candidates that are new for this saved search, or changed since last seen."""
+        seen = self.store.saved_fingerprints(search_key(role, location))
+        return [c for c in candidates if seen.get(_profile_key(c)) != profile_fingerprint(c)]
+
+    def remember(self, role: str, location: str, candidates: List[CandidateProfile]):
+        self.store.remember_profiles(search_key(role, location), {_profile_key(c): profile_fingerprint(c) for c in candidates})
+
+
+def _profile_key(candidate: CandidateProfile) -> str:
+    return canonical_profile_url(candidate.profile_url) or candidate.id
+
+
+def merge_by_id(existing: List[dict], updates: List[dict], key: str) -> List[dict]:
+    """Existing records with same-key updates replaced in place and new ones appended."""
+    updated = {r[key]: r for r in updates}
+    merged = [updated.pop(r[key], r) for r in existing]
+    return merged + list(updated.values())
@@ -1,10 +1,14 @@
 import os
 import json
 import time
+import threading
 from datetime import datetime, timezone
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Optional
 from apify_client import ApifyClient
 from .models import CandidateProfile
+from .urls import canonical_profile_url
+from .profile_store import ProfileStore
 
 # ─── SEARCH CONFIGURATION ───────────────────────────────────────────────
 # Change this number to control how many profiles are scraped per search.
@@ -13,6 +17,58 @@ from .models import CandidateProfile
 MAX_SEARCH_PROFILES = 50
 # ────────────────────────────────────────────────────────────────────────
 
+TERMINAL_RUN_STATUSES = {"SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT"}
+
+# Sharded search: one actor run per shard, run concurrently.
+SEARCH_SHARD_CONCURRENCY = 5
+# Deep scrape: profile URLs per actor run, and runs in flight at once.
+DEEP_SCRAPE_CHUNK_SIZE = 50
+DEEP_SCRAPE_CONCURRENCY = 4
+
+SENIORITY_SHARDS = ["Intern", "Junior", "Mid-level", "Senior", "Lead", "Principal", "Head of"]
+
+# ─── SEARCH PROJECTION CONFIGURATION ────────────────────────────────────
+# Only these fields are requested from the search dataset; everything else
+# (photos, skills, education, certifications...) never leaves Apify.
+SEARCH_ITEM_FIELDS = [
+    "firstName", "lastName", "fullName", "name", "publicIdentifier",
+    "headline", "openToWork", "linkedinUrl", "url", "profileUrl",
+    "location", "about", "summary", "experience",
+]
+# Keys kept from each experience entry (drops logos, company URNs, skills lists...)
+EXPERIENCE_FIELDS = ("position", "title", "companyName", "company", "startDate", "endDate", "duration", "description")
+# Set to the search actor's Open-to-Work input flag (e.g. "openToWork") to have
+# Apify return OTW profiles only. Off by default; the local OTW filter always applies.
+SEARCH_OTW_INPUT_KEY = os.getenv("SEARCH_OTW_INPUT_KEY", "")
+# ────────────────────────────────────────────────────────────────────────
+
+
+def is_open_to_work(item: dict) -> bool:
+    """Native HarvestAPI OTW flag, or the 'open to work' headline keyword."""
+    return item.get("openToWork") is True or "open to work" in (item.get("headline") or "").lower()
+
+
+def compact_experience(experience) -> list:
+    """Experience entries trimmed to EXPERIENCE_FIELDS, empty values dropped."""
+    if not isinstance(experience, list):
+        return []
+    return [
+        {k: e[k] for k in EXPERIENCE_FIELDS if e.get(k)}
+        for e in experience if isinstance(e, dict)
+    ]
+
+
+def search_run_input(query: str) -> dict:
+    run_input = {
+        "searchQuery": query,
+        "maxItems": MAX_SEARCH_PROFILES,  # Change MAX_SEARCH_PROFILES at the top of this file
+        "proxyConfiguration": { "useApifyProxy": True }
+    }
+    if SEARCH_OTW_INPUT_KEY:
+        run_input[SEARCH_OTW_INPUT_KEY] = True
+    return run_input
+
+
 class SourcingEngine:
     """
     Apify-powered Sourcing Funnel.
@@ -21,9 +77,11 @@ class SourcingEngine:
     3. Messaging (Send DM for LinkedIn) -> Outreach.
     4. Inbox (LinkedIn Unread Messages Scraper) -> Notifications.
     """
-    def __init__(self):
+    def __init__(self, profile_store: Optional[ProfileStore] = None):
         self.api_token = os.getenv("APIFY_API_TOKEN")
         self.client = ApifyClient(self.api_token) if self.api_token else None
+        # Every profile we pay Apify for is kept locally and reused while fresh
+        self.profile_store = profile_store or ProfileStore()
         
         # Outreach Credentials
         self.li_at = os.getenv("LINKEDIN_LI_AT")
@@ -53,62 +111,155 @@ class SourcingEngine:
         print(f"SEARCH: Fetching max 2500 profiles, then filtering for Open-to-Work...")
         
         # Prepare search keywords
-        query = f"{role} {location}"
-        
-        run_input = {
-            "searchQuery": query,
-            "maxItems": MAX_SEARCH_PROFILES,  # Change MAX_SEARCH_PROFILES at the top of this file
-            "proxyConfiguration": { "useApifyProxy": True }
-        }
+        return self._run_search(f"{role} {location}")
 
-        try:
-            run = self.client.actor(self.search_actor).call(run_input=run_input)
-            print(f"DONE: Search complete. Fetching results...")
-            
-            candidates = []
-            for item in self.client.dataset(run["defaultDatasetId"]).iterate_items():
-                # ROBUST NAME MAPPING: HarvestAPI uses firstName/lastName
-                f_name = item.get("firstName") or ""
-                l_name = item.get("lastName") or ""
-                name = item.get("fullName") or item.get("name") or f"{f_name} {l_name}".strip()
-                if not name or name.lower() == "linkedin member":
-                    name = item.get("publicIdentifier") or "Unknown Candidate"
-                
-                # Check OTW status (Both boolean and headline keyword)
-                headline = item.get("headline") or ""
-                is_otw = item.get("openToWork") is True or "open to work" in headline.lower()
-                
-                # STRICT FILTER: Only process those interested in opportunities
-                if not is_otw:
-                    continue
-
-                profile_url = item.get("linkedinUrl") or item.get("url") or item.get("profileUrl")
-                loc_obj = item.get("location")
-                location_text = ""
-                if isinstance(loc_obj, dict):
-                    location_text = loc_obj.get("linkedinText") or loc_obj.get("name") or ""
-                
-                # Capture full data
-                about = item.get("about") or item.get("summary")
-                experience = item.get("experience") or []
-                
-                candidates.append(CandidateProfile(
-                    id=profile_url or name,
-                    name=name,
-                    headline=headline,
-                    profile_url=profile_url,
-                    location=location_text,
-                    experience_text=json.dumps(experience) if experience else "",
-                    about=about,
-                    is_open_to_work=is_otw
-                ))
-            
-            print(f"DONE: Filtered for {len(candidates)} Open-to-Work candidates.")
-            return candidates
+    def search_candidates_sharded(self, role: str, location: str, shards: List[str], shard_by: str = "location") -> List[CandidateProfile]:
+        """
+        Splits one search into several actor runs and runs them concurrently, each
+        with its own 2500-profile cap. `shard_by="location"` uses each shard as the
+        location (e.g. cities of a country); `"keyword"` prefixes the role with it
+        (e.g. seniority levels). Results are merged and de-duplicated on canonical URL.
+        """
+        if not self.client:
+            print("⚠️ Skipping search: APIFY_API_TOKEN not set.")
+            return []
+
+        if shard_by == "keyword":
+            queries = [f"{shard} {role} {location}" for shard in shards]
+        else:
+            queries = [f"{role} {shard}" for shard in shards]
+        print(f"SEARCH: Launching {len(queries)} sharded Apify Searches for '{role}'...")
+
+        merged = {}
+        with ThreadPoolExecutor(max_workers=SEARCH_SHARD_CONCURRENCY) as pool:
+            for shard_candidates in pool.map(self._run_search, queries):
+                for c in shard_candidates:
+                    key = canonical_profile_url(c.profile_url) or c.id
+                    merged.setdefault(key, c)
+
+        print(f"DONE: {len(merged)} unique Open-to-Work candidates across {len(queries)} shards.")
+        return list(merged.values())
+
+    def _run_search(self, query: str) -> List[CandidateProfile]:
+        """
+        One search actor run for `query`, mapped and filtered to Open-to-Work.
+        Apify errors and unsuccessful runs raise, so a failed search is never
+        mistaken for one that found nobody.
+        """
+        run = self.client.actor(self.search_actor).call(run_input=search_run_input(query))
+        if (run or {}).get("status") != "SUCCEEDED":
+            raise RuntimeError(f"Apify search run for '{query}' ended with status {(run or {}).get('status')}")
+        print("DONE: Search complete. Fetching results...")
+
+        candidates = []
+        items = []
+        for item in self.client.dataset(run["defaultDatasetId"]).iterate_items(fields=SEARCH_ITEM_FIELDS):
+            # STRICT FILTER: Only process those interested in opportunities
+            if not is_open_to_work(item):
+                continue
+            item["experience"] = compact_experience(item.get("experience"))
+            items.append(item)
+            candidates.append(self.map_search_item(item))
+        self._store_profiles(items, source="search")
 
+        print(f"DONE: Filtered for {len(candidates)} Open-to-Work candidates.")
+        return candidates
+
+    def _store_profiles(self, items: List[dict], source: str, **kwargs):
+        """Keep paid-for profiles for reuse; a failed write only costs that reuse, never the search."""
+        try:
+            self.profile_store.put_many(items, source=source, **kwargs)
         except Exception as e:
-            print(f"ERROR: Apify Search Error: {e}")
-            return []
+            print(f"⚠️ Profile store write skipped ({len(items)} {source} profiles): {e}")
+
+    def map_search_item(self, item: dict) -> Optional[CandidateProfile]:
+        """
+        Maps one HarvestAPI search dataset item to a CandidateProfile.
+        Returns None for profiles that are not Open-to-Work.
+        """
+        # Check OTW status first (Both boolean and headline keyword), before any other work
+        if not is_open_to_work(item):
+            return None
+        headline = item.get("headline") or ""
+
+        # ROBUST NAME MAPPING: HarvestAPI uses firstName/lastName
+        f_name = item.get("firstName") or ""
+        l_name = item.get("lastName") or ""
+        name = item.get("fullName") or item.get("name") or f"{f_name} {l_name}".strip()
+        if not name or name.lower() == "linkedin member":
+            name = item.get("publicIdentifier") or "Unknown Candidate"
+
+        profile_url = item.get("linkedinUrl") or item.get("url") or item.get("profileUrl")
+        loc_obj = item.get("location")
+        location_text = ""
+        if isinstance(loc_obj, dict):
+            location_text = loc_obj.get("linkedinText") or loc_obj.get("name") or ""
+        
+        # Capture full data
+        about = item.get("about") or item.get("summary")
+        experience = compact_experience(item.get("experience"))
+        
+        return CandidateProfile(
+            id=profile_url or name,
+            name=name,
+            headline=headline,
+            profile_url=profile_url,
+            location=location_text,
+            experience_text=json.dumps(experience) if experience else "",
+            about=about,
+            is_open_to_work=True
+        )
+
+    def stream_search_items(self, role: str, location: str, poll_interval: float = 5.0, stop: Optional[threading.Event] = None) -> Iterator[dict]:
+        """
+        Starts the search actor without waiting for it and yields Open-to-Work
+        dataset items (projected to SEARCH_ITEM_FIELDS) as they appear, so
+        downstream stages can start before the run finishes.
+
+        Setting `stop`, or closing the generator early, aborts the actor run.
+        Raises RuntimeError if the run ends in any status but SUCCEEDED.
+        """
+        if not self.client:
+            print("⚠️ Skipping search: APIFY_API_TOKEN not set.")
+            return
+
+        run = self.client.actor(self.search_actor).start(run_input=search_run_input(f"{role} {location}"))
+        print(f"SEARCH: Streaming Apify Search run {run['id']} for '{role}' in '{location}'...")
+        dataset = self.client.dataset(run["defaultDatasetId"])
+        run_client = self.client.run(run["id"])
+
+        offset = 0
+        finished = False
+        try:
+            while not (stop is not None and stop.is_set()):
+                # Check status BEFORE reading, so items written just before the run finished are not missed
+                status = (run_client.get() or {}).get("status")
+                finished = status in TERMINAL_RUN_STATUSES
+                page = dataset.list_items(offset=offset, limit=1000, fields=SEARCH_ITEM_FIELDS)
+                otw = [item for item in page.items if is_open_to_work(item)]
+                for item in otw:
+                    item["experience"] = compact_experience(item.get("experience"))
+                self._store_profiles(otw, source="search")
+                for item in otw:
+                    yield item
+                offset += len(page.items)
+                if finished and not page.items:
+                    if status != "SUCCEEDED":
+                        raise RuntimeError(f"Search run {run['id']} ended with status {status}")
+                    return
+                if not page.items:
+                    if stop is not None:
+                        stop.wait(poll_interval)
+                    else:
+                        time.sleep(poll_interval)
+        finally:
+            if not finished:
+                # Stopped before the run ended: don't leave the actor running (and billing)
+                try:
+                    run_client.abort()
+                    print(f"SEARCH: Aborted Apify Search run {run['id']}.")
+                except Exception as e:
+                    print(f"⚠️ Could not abort search run {run['id']}: {e}")
 
     def deep_scrape_candidates(self, candidates: List[CandidateProfile], only_open_to_work: bool = False) -> List[CandidateProfile]:
         """
@@ -121,44 +272,63 @@ class SourcingEngine:
         if not valid_urls:
             return candidates
 
-        print(f"SCRAPE: Deep Scraping {len(valid_urls)} profiles via Apify...")
-        
-        run_input = {
-            "profileUrls": valid_urls,
-            "maxItems": len(valid_urls),
-            "proxyConfiguration": { "useApifyProxy": True }
-        }
+        # Serve fresh-enough profiles locally; only scrape missing or stale ones
+        stored = self.profile_store.get_fresh(valid_urls)
+        # One URL per profile, even if the same profile appears in several spellings
+        to_scrape = list({canonical_profile_url(u): u for u in valid_urls if canonical_profile_url(u) not in stored}.values())
+        print(f"SCRAPE: {len(stored)} profiles served from local store {self.profile_store.stats()}")
 
-        try:
-            run = self.client.actor(self.profile_actor).call(run_input=run_input)
-            
-            enriched_data = {}
-            for item in self.client.dataset(run["defaultDatasetId"]).iterate_items():
-                url = item.get("url") or item.get("profileUrl") or item.get("linkedinUrl")
-                if url:
-                    enriched_data[url] = item
-
-            results = []
-            for c in candidates:
-                if c.profile_url in enriched_data:
-                    data = enriched_data[c.profile_url]
-                    
-                    # Update candidate with full data
-                    c.headline = data.get("headline") or c.headline
-                    c.experience_text = json.dumps(data.get("experience", []))
-                    # Native HarvestAPI OTW flag
-                    c.is_open_to_work = data.get("openToWork", False) or "open to work" in (data.get("headline") or "").lower()
-                    
-                    if only_open_to_work and not c.is_open_to_work:
-                        continue # Skip if we only want OTW and this one isn't
-                        
-                results.append(c)
+        # Canonical URL -> item, so trailing slashes, www./locale hosts and query strings can't drop a match
+        enriched_data = dict(stored)
+        if to_scrape:
+            chunks = [to_scrape[i:i + DEEP_SCRAPE_CHUNK_SIZE] for i in range(0, len(to_scrape), DEEP_SCRAPE_CHUNK_SIZE)]
+            print(f"SCRAPE: Deep Scraping {len(to_scrape)} profiles via Apify in {len(chunks)} concurrent chunks...")
+            failed = 0
+            with ThreadPoolExecutor(max_workers=DEEP_SCRAPE_CONCURRENCY) as pool:
+                futures = [pool.submit(self._scrape_profiles, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    try:
+                        items = future.result()
+                    except Exception as e:
+                        failed += 1
+                        print(f"❌ Apify Deep Scrape Error: {e}")
+                        continue
+                    # Merge each chunk as soon as it lands
+                    for item in items:
+                        for key in ("url", "profileUrl", "linkedinUrl"):
+                            url = canonical_profile_url(item.get(key))
+                            if url:
+                                enriched_data[url] = item
+                    self._store_profiles(items, source="profile", url_keys=("url", "profileUrl", "linkedinUrl"))
+            if failed == len(chunks) and not stored:
+                return candidates
+
+        results = []
+        for c in candidates:
+            data = enriched_data.get(canonical_profile_url(c.profile_url))
+            if data:
+                # Update candidate with full data
+                c.headline = data.get("headline") or c.headline
+                c.experience_text = json.dumps(compact_experience(data.get("experience")))
+                # Native HarvestAPI OTW flag
+                c.is_open_to_work = data.get("openToWork", False) or "open to work" in (data.get("headline") or "").lower()
                 
-            return results
+                if only_open_to_work and not c.is_open_to_work:
+                    continue # Skip if we only want OTW and this one isn't
+                    
+            results.append(c)
+            
+        return results
 
-        except Exception as e:
-            print(f"❌ Apify Deep Scrape Error: {e}")
-            return candidates
+    def _scrape_profiles(self, urls: List[str]) -> List[dict]:
+        """One profile actor run for a chunk of URLs."""
+        run_input = {
+            "profileUrls": urls,
+            "maxItems": len(urls),
+            "proxyConfiguration": { "useApifyProxy": True }
+        }
+        run = self.client.actor(self.profile_actor).call(run_input=run_input)
+        return list(self.client.dataset(run["defaultDatasetId"]).iterate_items())
 
     def send_outreach(self, profile_url: str, message_text: str) -> bool:
         """
@@ -0,0 +1,96 @@
+"""
+Async variant of SourcingEngine built on ApifyClientAsync.
+
+One ApifyClientAsync (and therefore one pooled HTTP session) is shared by every
+call. Actors are started without blocking and their completion is awaited by
+polling, so a FastAPI event loop can serve many concurrent outreach and inbox
+operations without tying up worker threads.
+"""
+
+import os
+import time
+from typing import List, Optional
+from apify_client import ApifyClientAsync
+from .sourcing import SourcingEngine, TERMINAL_RUN_STATUSES
+from .profile_store import ProfileStore
+
+# How long each server-side wait for a run may take before we poll again (seconds).
+RUN_POLL_SECONDS = 30
+# Longest we wait for one actor run before aborting it (seconds).
+RUN_MAX_WAIT_SECONDS = float(os.getenv("RUN_MAX_WAIT_SECONDS", "600"))
+
+
+class AsyncSourcingEngine(SourcingEngine):
+    """
+    Same actors, item mapping and profile store as SourcingEngine, but the
+    Apify-facing methods are coroutines.
+    """
+    def __init__(self, profile_store: Optional[ProfileStore] = None):
+        super().__init__(profile_store=profile_store)
+        self.async_client = ApifyClientAsync(self.api_token) if self.api_token else None
+
+    async def _call_actor(self, actor_id: str, run_input: Optional[dict] = None) -> dict:
+        """
+        Start an actor run and await its completion without blocking the event loop.
+        A run still going after RUN_MAX_WAIT_SECONDS is aborted and raises TimeoutError.
+        """
+        run = await self.async_client.actor(actor_id).start(run_input=run_input)
+        run_client = self.async_client.run(run["id"])
+        deadline = time.monotonic() + RUN_MAX_WAIT_SECONDS
+        while run.get("status") not in TERMINAL_RUN_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                await run_client.abort()
+                raise TimeoutError(f"Actor {actor_id} run {run['id']} still {run.get('status')} after {RUN_MAX_WAIT_SECONDS:.0f}s; aborted")
+            run = await run_client.wait_for_finish(wait_secs=max(1, min(RUN_POLL_SECONDS, int(remaining)))) or run
+        if run.get("status") != "SUCCEEDED":
+            raise RuntimeError(f"Actor {actor_id} run {run['id']} ended with status {run.get('status')}")
+        return run
+
+    async def _dataset_items(self, dataset_id: str, fields: Optional[List[str]] = None) -> List[dict]:
+        items = []
+        async for item in self.async_client.dataset(dataset_id).iterate_items(fields=fields):
+            items.append(item)
+        return items
+
+    async def send_outreach_async(self, profile_url: str, message_text: str) -> bool:
+        if not self.async_client:
+            print("⚠️ Outreach failed: APIFY_API_TOKEN not set.")
+            return False
+        if not self.li_at:
+            print("⚠️ Outreach failed: LINKEDIN_LI_AT cookie not set in .env.")
+            return False
+
+        print(f"OUTREACH: Sending Apify Outreach to {profile_url}...")
+        run_input = {
+            "profileUrl": profile_url,
+            "messageText": message_text,
+            "liAtCookie": self.li_at,
+            "userAgent": self.user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+        }
+        try:
+            await self._call_actor(self.message_actor, run_input)
+            print("DONE: Message sent successfully.")
+            return True
+        except Exception as e:
+            print(f"❌ Apify Message Error: {e}")
+            return False
+
+    async def check_replies_async(self) -> List[dict]:
+        if not self.async_client:
+            return []
+
+        print("INBOX: Checking for new replies via Apify...")
+        try:
+            run = await self._call_actor(self.inbox_actor)
+            return [
+                {
+                    "from": item.get("senderName"),
+                    "text": item.get("lastMessage"),
+                    "threadUrl": item.get("threadUrl")
+                }
+                for item in await self._dataset_items(run["defaultDatasetId"])
+            ]
+        except Exception as e:
+            print(f"❌ Apify Inbox Error: {e}")
+            return []
@@ -0,0 +1,557 @@
+"""
+SQLite storage for pipeline state shared by the API server and the stage runner.
+
+Runs, sourced candidates, assessments, status and persona live in one WAL-mode
+database instead of JSON files. Writers upsert inside transactions, so a reader
+never sees a half-written file, and the indexed tables let the server read a
+page or a single row instead of re-parsing everything on every poll.
+
+Every write also appends to an `events` table in the same transaction. The
+server tails it to push status changes and new results to the UI, and its
+autoincrement IDs double as resumable event IDs. Events are kept only back to
+a run's last `reset` (which tells clients to refetch everything) and at most
+EVENT_RETENTION per run; a client resuming from before that gets a `reset`.
+
+The saved-search memory for incremental sourcing (a content fingerprint per
+profile seen by each search) lives here too, pruned with the runs.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import datetime
+from collections import OrderedDict
+from datetime import timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# ─── STORAGE CONFIGURATION ──────────────────────────────────────────────
+PIPELINE_DB_PATH = os.getenv("PIPELINE_DB_PATH", "pipeline.db")
+RUN_RETENTION_DAYS = float(os.getenv("RUN_RETENTION_DAYS", "14"))   # runs untouched this long are pruned, 0 = never
+RUN_RETENTION_COUNT = int(os.getenv("RUN_RETENTION_COUNT", "50"))   # most recently updated runs kept, 0 = all
+EVENT_RETENTION = int(os.getenv("EVENT_RETENTION", "500"))        # newest push events kept per run
+SAVED_SEARCH_RETENTION_DAYS = float(os.getenv("SAVED_SEARCH_RETENTION_DAYS", "90"))  # saved-search profiles unseen this long are forgotten, 0 = never
+CANDIDATE_INDEX_SIZE = 10000  # records kept per run by CandidateIndex
+CANDIDATE_INDEX_RUNS = 16     # runs kept by CandidateIndex, least recently used dropped first
+# ────────────────────────────────────────────────────────────────────────
+
+# The run used when a caller doesn't name one (CLI runs, older clients).
+DEFAULT_RUN_ID = "current"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    role TEXT,
+    location TEXT,
+    persona TEXT,
+    fingerprint TEXT,
+    delta TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    events_floor INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    seq INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    is_open_to_work INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    UNIQUE (run_id, id)
+);
+CREATE TABLE IF NOT EXISTS assessments (
+    seq INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    candidate_id TEXT NOT NULL,
+    overall_score INTEGER,
+    tier INTEGER,
+    recommended_action TEXT,
+    data TEXT NOT NULL,
+    UNIQUE (run_id, candidate_id)
+);
+CREATE INDEX IF NOT EXISTS idx_assessments_score ON assessments (run_id, overall_score);
+CREATE INDEX IF NOT EXISTS idx_assessments_tier ON assessments (run_id, tier);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_run ON events (run_id, id);
+CREATE TABLE IF NOT EXISTS status (
+    run_id TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    message TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS saved_profiles (
+    search TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    seen_at TEXT NOT NULL,
+    PRIMARY KEY (search, profile)
+);
+CREATE INDEX IF NOT EXISTS idx_saved_profiles_seen ON saved_profiles (seen_at);
+"""
+
+# Columns missing from databases created by the first version of _SCHEMA; keep in sync with it.
+_ADDED_COLUMNS = {
+    "runs": (("delta", "TEXT"), ("version", "INTEGER NOT NULL DEFAULT 0"), ("events_floor", "INTEGER NOT NULL DEFAULT 0")),
+}
+
+
+# Sort keys accepted by query_assessments; position is the order results were stored in.
+ASSESSMENT_SORTS = {"position": "a.seq", "score": "a.overall_score", "tier": "a.tier"}
+
+
+def _now() -> str:
+    return datetime.datetime.now(timezone.utc).isoformat()
+
+
+def _days_ago(days: float) -> str:
+    return (datetime.datetime.now(timezone.utc) - datetime.timedelta(days=days)).isoformat()
+
+
+class PipelineStore:
+    def __init__(self, path: str = PIPELINE_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # The server and a stage subprocess may write at the same time; wait for the lock rather than fail
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self._conn.commit()
+
+    def _migrate(self):
+        """Add columns introduced after a table was first created to databases made by older versions."""
+        for table, added in _ADDED_COLUMNS.items():
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for name, ddl in added:
+                if name not in columns:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+    # ─── runs / persona ─────────────────────────────────────────────────
+    def _ensure_run(self, run_id: str):
+        now = _now()
+        self._conn.execute(
+            "INSERT OR IGNORE INTO runs (id, created_at, updated_at) VALUES (?, ?, ?)", (run_id, now, now)
+        )
+
+    def start_run(self, run_id: str, role: str, location: Optional[str] = None):
+        with self._lock, self._conn:
+            self._ensure_run(run_id)
+            self._conn.execute(
+                "UPDATE runs SET role = ?, location = ?, updated_at = ? WHERE id = ?", (role, location, _now(), run_id)
+            )
+
+    def _touch(self, run_id: str):
+        """Bump the run's data version; called inside every candidate/assessment write."""
+        self._ensure_run(run_id)
+        self._conn.execute("UPDATE runs SET version = version + 1, updated_at = ? WHERE id = ?", (_now(), run_id))
+
+    def _emit(self, run_id: str, event_type: str, payload):
+        """Append a push event and prune the run's older ones; called inside the transaction of the write it describes."""
+        event_id = self._conn.execute(
+            "INSERT INTO events (run_id, type, data) VALUES (?, ?, ?)", (run_id, event_type, json.dumps(payload))
+        ).lastrowid
+        if event_type == "reset":
+            # Clients refetch everything on a reset, so nothing before it is worth replaying
+            floor = event_id - 1
+        else:
+            row = self._conn.execute(
+                "SELECT id FROM events WHERE run_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?", (run_id, EVENT_RETENTION)
+            ).fetchone()
+            if not row:
+                return
+            floor = row[0]
+        self._conn.execute("DELETE FROM events WHERE run_id = ? AND id <= ?", (run_id, floor))
+        self._ensure_run(run_id)
+        self._conn.execute("UPDATE runs SET events_floor = MAX(events_floor, ?) WHERE id = ?", (floor, run_id))
+
+    def events_floor(self, run_id: str) -> int:
+        """Highest pruned event ID of the run: a client resuming from before it has missed events."""
+        with self._lock:
+            row = self._conn.execute("SELECT events_floor FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return row[0] if row else 0
+
+    def events_since(self, run_id: str, after_id: int, limit: int = 500) -> List[Tuple[int, str, str]]:
+        """(id, type, JSON data) of the run's events after `after_id`, oldest first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, type, data FROM events WHERE run_id = ? AND id > ? ORDER BY id LIMIT ?", (run_id, after_id, limit)
+            ).fetchall()
+
+    def last_event_id(self, run_id: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM events WHERE run_id = ?", (run_id,)).fetchone()[0]
+
+    def data_version(self, run_id: str) -> Tuple[int, Optional[str]]:
+        """(version, updated_at) of a run's candidates and assessments, for cache validation."""
+        with self._lock:
+            row = self._conn.execute("SELECT version, updated_at FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return (row[0], row[1]) if row else (0, None)
+
+    def get_run(self, run_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, role, location, persona, fingerprint, created_at, updated_at FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return dict(zip(("id", "role", "location", "persona", "fingerprint", "created_at", "updated_at"), row))
+
+    def set_persona(self, run_id: str, persona: Optional[str]):
+        with self._lock, self._conn:
+            self._ensure_run(run_id)
+            self._conn.execute("UPDATE runs SET persona = ?, updated_at = ? WHERE id = ?", (persona, _now(), run_id))
+
+    def get_persona(self, run_id: str) -> Optional[str]:
+        run = self.get_run(run_id)
+        return run["persona"] if run else None
+
+    def list_runs(self) -> List[dict]:
+        """Every run with its current status, most recently updated first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.id, r.role, r.location, r.created_at, r.updated_at, s.stage, s.message "
+                "FROM runs r LEFT JOIN status s ON s.run_id = r.id ORDER BY r.updated_at DESC"
+            ).fetchall()
+        return [dict(zip(("run_id", "role", "location", "created_at", "updated_at", "stage", "message"), row)) for row in rows]
+
+    def set_delta(self, run_id: str, delta: Optional[dict]):
+        """This run's saved search and the ids sourced but not analyzed yet: {"search": key, "ids": [...]}."""
+        with self._lock, self._conn:
+            self._ensure_run(run_id)
+            self._conn.execute("UPDATE runs SET delta = ? WHERE id = ?", (json.dumps(delta) if delta else None, run_id))
+
+    def get_delta(self, run_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT delta FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def latest_delta(self, search: str) -> Optional[Tuple[str, dict]]:
+        """(run_id, delta) of the most recently updated run whose last sourcing was `search`."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, delta FROM runs WHERE delta IS NOT NULL ORDER BY updated_at DESC"
+            ).fetchall()
+        for run_id, delta in rows:
+            delta = json.loads(delta)
+            if delta.get("search") == search:
+                return run_id, delta
+        return None
+
+    def copy_run_data(self, source_run_id: str, target_run_id: str):
+        """Replace the target run's candidates and assessments with copies of the source run's."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM candidates WHERE run_id = ?", (target_run_id,))
+            self._conn.execute("DELETE FROM assessments WHERE run_id = ?", (target_run_id,))
+            self._conn.execute(
+                "INSERT INTO candidates (run_id, id, is_open_to_work, data) "
+                "SELECT ?, id, is_open_to_work, data FROM candidates WHERE run_id = ? ORDER BY seq",
+                (target_run_id, source_run_id),
+            )
+            self._conn.execute(
+                "INSERT INTO assessments (run_id, candidate_id, overall_score, tier, recommended_action, data) "
+                "SELECT ?, candidate_id, overall_score, tier, recommended_action, data FROM assessments WHERE run_id = ? ORDER BY seq",
+                (target_run_id, source_run_id),
+            )
+            self._touch(target_run_id)
+            self._emit(target_run_id, "reset", {"scope": "run"})
+
+    def set_fingerprint(self, run_id: str, fingerprint: Optional[str]):
+        with self._lock, self._conn:
+            self._ensure_run(run_id)
+            self._conn.execute("UPDATE runs SET fingerprint = ?, updated_at = ? WHERE id = ?", (fingerprint, _now(), run_id))
+
+    def clear_run(self, run_id: str):
+        """Drop a run's candidates, assessments, checkpoint and delta; role and persona are kept."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM candidates WHERE run_id = ?", (run_id,))
+            self._conn.execute("DELETE FROM assessments WHERE run_id = ?", (run_id,))
+            self._touch(run_id)
+            self._conn.execute("UPDATE runs SET fingerprint = NULL, delta = NULL WHERE id = ?", (run_id,))
+            # Also drops the older events, which describe data that no longer exists
+            self._emit(run_id, "reset", {"scope": "run"})
+
+    def delete_run(self, run_id: str) -> bool:
+        """Remove a run and everything stored for it; False if it didn't exist."""
+        with self._lock, self._conn:
+            return self._delete_run(run_id)
+
+    def _delete_run(self, run_id: str) -> bool:
+        for table in ("candidates", "assessments", "events", "status"):
+            self._conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+        return self._conn.execute("DELETE FROM runs WHERE id = ?", (run_id,)).rowcount > 0
+
+    def prune_runs(
+        self,
+        max_age_days: float = RUN_RETENTION_DAYS,
+        keep: int = RUN_RETENTION_COUNT,
+        exclude: Iterable[str] = (),
+        saved_search_days: float = SAVED_SEARCH_RETENTION_DAYS,
+    ) -> List[str]:
+        """
+        Delete runs not updated for `max_age_days`, and all but the `keep` most
+        recently updated ones. Runs in `exclude` (e.g. with a job in progress) are
+        never deleted. Saved-search profiles not seen for `saved_search_days` are
+        forgotten as well. Returns the deleted run IDs.
+        """
+        exclude = set(exclude)
+        cutoff = _days_ago(max_age_days) if max_age_days else None
+        with self._lock, self._conn:
+            if saved_search_days:
+                self._conn.execute("DELETE FROM saved_profiles WHERE seen_at < ?", (_days_ago(saved_search_days),))
+            rows = self._conn.execute("SELECT id, updated_at FROM runs ORDER BY updated_at DESC").fetchall()
+            doomed = [
+                run_id for position, (run_id, updated_at) in enumerate(rows)
+                if run_id not in exclude and ((keep and position >= keep) or (cutoff and updated_at < cutoff))
+            ]
+            for run_id in doomed:
+                self._delete_run(run_id)
+        return doomed
+
+    # ─── saved searches ─────────────────────────────────────────────────
+    def saved_fingerprints(self, search: str) -> Dict[str, str]:
+        """{profile key: content fingerprint} of every profile the saved search has seen."""
+        with self._lock:
+            rows = self._conn.execute("SELECT profile, fingerprint FROM saved_profiles WHERE search = ?", (search,)).fetchall()
+        return dict(rows)
+
+    def remember_profiles(self, search: str, fingerprints: Dict[str, str]):
+        """Upsert the fingerprints of profiles the saved search just returned, marking them seen now."""
+        now = _now()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO saved_profiles (search, profile, fingerprint, seen_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (search, profile) DO UPDATE SET fingerprint = excluded.fingerprint, seen_at = excluded.seen_at",
+                [(search, profile, fp, now) for profile, fp in fingerprints.items()],
+            )
+
+    # ─── status ─────────────────────────────────────────────────────────
+    def set_status(self, run_id: str, stage: str, message: str) -> dict:
+        status = {"stage": stage, "message": message, "timestamp": _now()}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO status (run_id, stage, message, timestamp) VALUES (?, ?, ?, ?)",
+                (run_id, stage, message, status["timestamp"]),
+            )
+            self._emit(run_id, "status", status)
+        return status
+
+    def get_status(self, run_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT stage, message, timestamp FROM status WHERE run_id = ?", (run_id,)).fetchone()
+        return dict(zip(("stage", "message", "timestamp"), row)) if row else None
+
+    # ─── candidates ─────────────────────────────────────────────────────
+    def put_candidates(self, run_id: str, candidates: Iterable[dict], replace: bool = False):
+        """
+        Upsert candidate dicts by id. New candidates are appended in the given
+        order; `replace` drops the run's other candidates in the same transaction.
+        """
+        candidates = list(candidates)
+        rows = [(run_id, c["id"], int(bool(c.get("is_open_to_work"))), json.dumps(c)) for c in candidates]
+        with self._lock, self._conn:
+            if replace:
+                self._conn.execute("DELETE FROM candidates WHERE run_id = ?", (run_id,))
+            self._conn.executemany(
+                "INSERT INTO candidates (run_id, id, is_open_to_work, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (run_id, id) DO UPDATE SET is_open_to_work = excluded.is_open_to_work, data = excluded.data",
+                rows,
+            )
+            self._touch(run_id)
+            if replace:
+                self._emit(run_id, "reset", {"scope": "sourced"})
+            else:
+                self._emit(run_id, "sourced", {"candidates": candidates})
+
+    def candidates(self, run_id: str, limit: int = -1, offset: int = 0) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM candidates WHERE run_id = ? ORDER BY seq LIMIT ? OFFSET ?", (run_id, limit, offset)
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def query_candidates(self, run_id: str, otw: Optional[bool] = None, limit: int = -1, offset: int = 0) -> Tuple[List[dict], int]:
+        """One page of a run's candidates in sourced order, plus the total matching the filter."""
+        where, params = "run_id = ?", [run_id]
+        if otw is not None:
+            where += " AND is_open_to_work = ?"
+            params.append(int(otw))
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM candidates WHERE {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT data FROM candidates WHERE {where} ORDER BY seq LIMIT ? OFFSET ?", params + [limit, offset]
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows], total
+
+    def count_candidates(self, run_id: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM candidates WHERE run_id = ?", (run_id,)).fetchone()[0]
+
+    def get_candidate(self, run_id: str, candidate_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM candidates WHERE run_id = ? AND id = ?", (run_id, candidate_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # ─── assessments ────────────────────────────────────────────────────
+    @staticmethod
+    def _assessment_row(run_id: str, result: dict) -> tuple:
+        return (
+            run_id, result["candidate_id"], result.get("overall_score"), result.get("tier"),
+            result.get("recommended_action"), json.dumps(result),
+        )
+
+    def upsert_assessment(self, run_id: str, result: dict):
+        """Insert or replace one assessment; a re-assessed candidate keeps its position."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO assessments (run_id, candidate_id, overall_score, tier, recommended_action, data) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (run_id, candidate_id) DO UPDATE SET overall_score = excluded.overall_score, "
+                "tier = excluded.tier, recommended_action = excluded.recommended_action, data = excluded.data",
+                self._assessment_row(run_id, result),
+            )
+            self._touch(run_id)
+            self._emit(run_id, "result", result)
+
+    def replace_assessments(self, run_id: str, results: List[dict]):
+        """Atomically swap in the run's final results, in the given order."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM assessments WHERE run_id = ?", (run_id,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO assessments (run_id, candidate_id, overall_score, tier, recommended_action, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [self._assessment_row(run_id, r) for r in results],
+            )
+            self._touch(run_id)
+            self._emit(run_id, "reset", {"scope": "results"})
+
+    def clear_assessments(self, run_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM assessments WHERE run_id = ?", (run_id,))
+            self._touch(run_id)
+            self._emit(run_id, "reset", {"scope": "results"})
+
+    def assessments(self, run_id: str, limit: int = -1, offset: int = 0) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM assessments WHERE run_id = ? ORDER BY seq LIMIT ? OFFSET ?", (run_id, limit, offset)
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def query_assessments(
+        self,
+        run_id: str,
+        tier: Optional[int] = None,
+        action: Optional[str] = None,
+        otw: Optional[bool] = None,
+        sort: str = "position",
+        descending: bool = False,
+        limit: int = -1,
+        offset: int = 0,
+    ) -> Tuple[List[dict], int]:
+        """One filtered, sorted page of a run's assessments, plus the total matching the filters."""
+        where, params = ["a.run_id = ?"], [run_id]
+        if tier is not None:
+            where.append("a.tier = ?")
+            params.append(tier)
+        if action:
+            where.append("a.recommended_action = ?")
+            params.append(action)
+        if otw is not None:
+            # OTW lives on the sourced profile
+            where.append("COALESCE(c.is_open_to_work, 0) = ?")
+            params.append(int(otw))
+        sql = (
+            "FROM assessments a LEFT JOIN candidates c ON c.run_id = a.run_id AND c.id = a.candidate_id "
+            f"WHERE {' AND '.join(where)}"
+        )
+        order = f"{ASSESSMENT_SORTS[sort]} {'DESC' if descending else 'ASC'}, a.seq"
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) {sql}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT a.data {sql} ORDER BY {order} LIMIT ? OFFSET ?", params + [limit, offset]
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows], total
+
+    def get_assessment(self, run_id: str, candidate_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM assessments WHERE run_id = ? AND candidate_id = ?", (run_id, candidate_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CandidateIndex:
+    """
+    In-memory candidate_id -> record lookup over a PipelineStore for hot
+    single-candidate reads such as /generate-message. The assessment is
+    preferred and the sourced profile is the fallback. A run's entries are
+    dropped as soon as its data version changes, so a hit is never stale and
+    costs one primary-key read of the version.
+    """
+    def __init__(self, store: PipelineStore, max_entries: int = CANDIDATE_INDEX_SIZE, max_runs: int = CANDIDATE_INDEX_RUNS):
+        self.store = store
+        self.max_entries = max_entries
+        self.max_runs = max_runs
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._runs: "OrderedDict[str, Tuple[int, OrderedDict]]" = OrderedDict()
+
+    def forget(self, run_id: str):
+        """Drop a run's entries, e.g. after the run was deleted."""
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def get(self, run_id: str, candidate_id: str) -> Optional[dict]:
+        version, _ = self.store.data_version(run_id)
+        with self._lock:
+            cached_version, entries = self._runs.get(run_id, (None, None))
+            if cached_version != version:
+                entries = OrderedDict()
+                self._runs[run_id] = (version, entries)
+            self._runs.move_to_end(run_id)
+            while len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+            if candidate_id in entries:
+                entries.move_to_end(candidate_id)
+                self.hits += 1
+                return entries[candidate_id]
+            self.misses += 1
+
+        record = self.store.get_assessment(run_id, candidate_id) or self.store.get_candidate(run_id, candidate_id)
+        with self._lock:
+            # Only cache if nothing was written while we were reading
+            if self._runs.get(run_id, (None,))[0] == version and self.store.data_version(run_id)[0] == version:
+                entries[candidate_id] = record
+                if len(entries) > self.max_entries:
+                    entries.popitem(last=False)
+        return record
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+
+_store: Optional[PipelineStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> PipelineStore:
+    """The process-wide PipelineStore, opened on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PipelineStore()
+        return _store
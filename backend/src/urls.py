@@ -0,0 +1,18 @@
+from typing import Optional
+from urllib.parse import urlsplit, unquote
+
+
+def canonical_profile_url(url: Optional[str]) -> Optional[str]:
+    """
+    Normalises a LinkedIn profile URL so the same profile always maps to one key:
+    scheme, www./country subdomains, query, fragment, case and trailing slash are ignored.
+    e.g. "http://pk.linkedin.com/in/Jane-Doe/?locale=en_US" -> "https://www.linkedin.com/in/jane-doe"
+    """
+    if not url:
+        return None
+    parts = urlsplit(url.strip() if "://" in url else f"https://{url.strip()}")
+    host = parts.netloc.lower().split("@")[-1].split(":")[0]
+    if host == "linkedin.com" or host.endswith(".linkedin.com"):
+        host = "www.linkedin.com"
+    path = unquote(parts.path).rstrip("/").lower()
+    return f"https://{host}{path}"
@@ -4,6 +4,9 @@ import SourcedList from './components/SourcedList'
 
 const API = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
+// Every search gets its own run id, so parallel searches (other tabs, other recruiters) don't collide
+const newRunId = () => (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`)
+
 export default function App() {
   // ─── Form State ─────────────────────────────────────────────────
   const [role, setRole] = useState('')
@@ -23,42 +26,60 @@ export default function App() {
   const [ranked, setRanked] = useState([])
   const [deepScraped, setDeepScraped] = useState([])
   const [results, setResults] = useState([])
+  const [live, setLive] = useState(false)   // true while the /events push channel is connected
+  const [runId, setRunId] = useState(() => localStorage.getItem('last_run_id') || newRunId())
+  const runQuery = `run_id=${encodeURIComponent(runId)}`
+
+  // ─── Status Handling ───────────────────────────────────────────
+  const applyStatus = (d) => {
+    // Always process status updates (no timestamp check needed — state is reset on each action click)
+    setStatusMsg(d.message || '')
+    const stage = (d.stage || '').toLowerCase()
+
+    // Use exact stage matching for reliability
+    if (stage === 'sourcing') setStage1Status('running')
+    else if (stage === 'sourcing_done') setStage1Status('done')
+    else if (stage === 'ranking') setStage2Status('running')
+    else if (stage === 'ranking_done') setStage2Status('done')
+    else if (stage === 'deep_scraping') setStage3Status('running')
+    else if (stage === 'deep_scrape_done') setStage3Status('done')
+    else if (stage === 'analyzing') setStage4Status('running')
+    else if (stage === 'done') setStage4Status('done')
+    else if (stage === 'error') {
+      const failIfRunning = s => (s === 'running' ? 'error' : s)
+      setStage1Status(failIfRunning)
+      setStage2Status(failIfRunning)
+      setStage3Status(failIfRunning)
+      setStage4Status(failIfRunning)
+    }
+  }
+
+  // Replace records with the same key in place, append new ones
+  const upsertBy = (key, updates) => prev => {
+    const byKey = new Map(updates.map(u => [u[key], u]))
+    const merged = prev.map(p => {
+      const u = byKey.get(p[key])
+      if (u) byKey.delete(p[key])
+      return u || p
+    })
+    return merged.concat([...byKey.values()])
+  }
 
   // ─── Polling & Data Sync ───────────────────────────────────────
   const fetchData = async () => {
     try {
       // 1. Fetch Status
-      const statusRes = await fetch(`${API}/status?t=${Date.now()}`)
-      if (statusRes.ok) {
-        const d = await statusRes.json()
-
-        // Always process status updates (no timestamp check needed — state is reset on each action click)
-        setStatusMsg(d.message || '')
-        const stage = (d.stage || '').toLowerCase()
-
-        // Use exact stage matching for reliability
-        if (stage === 'sourcing') setStage1Status('running')
-        else if (stage === 'sourcing_done') setStage1Status('done')
-        else if (stage === 'ranking') setStage2Status('running')
-        else if (stage === 'ranking_done') setStage2Status('done')
-        else if (stage === 'deep_scraping') setStage3Status('running')
-        else if (stage === 'deep_scrape_done') setStage3Status('done')
-        else if (stage === 'analyzing') setStage4Status('running')
-        else if (stage === 'done') setStage4Status('done')
-        else if (stage === 'error') {
-          if (stage1Status === 'running') setStage1Status('error')
-          if (stage2Status === 'running') setStage2Status('error')
-          if (stage3Status === 'running') setStage3Status('error')
-          if (stage4Status === 'running') setStage4Status('error')
-        }
-      }
+      const statusRes = await fetch(`${API}/status?${runQuery}&t=${Date.now()}`)
+      if (statusRes.ok) applyStatus(await statusRes.json())
 
       // 2. Fetch Data (Always refresh all visible data to ensure sync)
+      // /sourced and /results revalidate with ETags: a stable URL lets the browser send
+      // If-None-Match and reuse its cached copy when the server answers 304
       const [sRes, rRes, dsRes, resRes] = await Promise.all([
-        fetch(`${API}/sourced?t=${Date.now()}`),
-        fetch(`${API}/ranked?t=${Date.now()}`),
-        fetch(`${API}/deep-scraped?t=${Date.now()}`),
-        fetch(`${API}/results?t=${Date.now()}`)
+        fetch(`${API}/sourced?${runQuery}`),
+        fetch(`${API}/ranked?${runQuery}&t=${Date.now()}`),
+        fetch(`${API}/deep-scraped?${runQuery}&t=${Date.now()}`),
+        fetch(`${API}/results?${runQuery}`)
       ])
 
       if (sRes.ok) { const d = await sRes.json(); setSourced(d.sourced || []) }
@@ -71,19 +92,34 @@ export default function App() {
     }
   }
 
-  // Load data on mount
+  // Load data on mount and whenever a new run starts
   useEffect(() => {
     fetchData()
-  }, [])
+  }, [runId])
 
-  // Poll when something is running
+  // Live updates: the backend pushes status changes and new results as Server-Sent Events.
+  // EventSource reconnects by itself and resumes from the last event id it saw.
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return
+    const events = new EventSource(`${API}/events?${runQuery}`)
+    events.onopen = () => setLive(true)
+    events.onerror = () => setLive(false)
+    events.addEventListener('status', e => applyStatus(JSON.parse(e.data)))
+    events.addEventListener('result', e => setResults(upsertBy('candidate_id', [JSON.parse(e.data)])))
+    events.addEventListener('sourced', e => setSourced(upsertBy('id', JSON.parse(e.data).candidates || [])))
+    // Bulk changes (new run, final re-ordering) are cheaper to refetch than to replay
+    events.addEventListener('reset', () => fetchData())
+    return () => events.close()
+  }, [runId])
+
+  // Fall back to polling when something is running and the push channel is down
   useEffect(() => {
     const anyRunning = stage1Status === 'running' || stage2Status === 'running' || stage3Status === 'running' || stage4Status === 'running'
-    if (!anyRunning) return
+    if (!anyRunning || live) return
 
     const id = setInterval(fetchData, 3000)
     return () => clearInterval(id)
-  }, [stage1Status, stage2Status, stage3Status, stage4Status, actionStartTime])
+  }, [stage1Status, stage2Status, stage3Status, stage4Status, actionStartTime, live, runId])
 
   // ─── Actions ────────────────────────────────────────────────────
   const startSourcing = async () => {
@@ -93,12 +129,15 @@ export default function App() {
     setStatusMsg('Starting sourcing...')
     setActionStartTime(Date.now())
     setStage2Status('idle'); setStage3Status('idle'); setStage4Status('idle')
+    const id = newRunId()
+    setRunId(id)
     try {
       localStorage.setItem('last_search_role', role.trim())
+      localStorage.setItem('last_run_id', id)
       const res = await fetch(`${API}/start-sourcing`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ role: role.trim(), location: location.trim() || 'Pakistan', search_depth: 10 }),
+        body: JSON.stringify({ role: role.trim(), location: location.trim() || 'Pakistan', search_depth: 10, run_id: id }),
       })
       if (!res.ok) throw new Error((await res.json()).detail)
     } catch (err) {
@@ -118,7 +157,7 @@ export default function App() {
       const res = await fetch(`${API}/start-ranking`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ role: role.trim(), persona: persona.trim() }),
+        body: JSON.stringify({ role: role.trim(), persona: persona.trim(), run_id: runId }),
       })
       if (!res.ok) throw new Error((await res.json()).detail)
     } catch (err) {
@@ -137,7 +176,7 @@ export default function App() {
       const res = await fetch(`${API}/start-deep-scrape`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ role: role.trim(), persona: persona.trim() }),
+        body: JSON.stringify({ role: role.trim(), persona: persona.trim(), run_id: runId }),
       })
       if (!res.ok) throw new Error((await res.json()).detail)
     } catch (err) {
@@ -155,7 +194,7 @@ export default function App() {
       const res = await fetch(`${API}/start-analyze`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ role: role.trim(), persona: persona.trim() }),
+        body: JSON.stringify({ role: role.trim(), persona: persona.trim(), run_id: runId }),
       })
       if (!res.ok) throw new Error((await res.json()).detail)
     } catch (err) {
@@ -29,8 +29,9 @@ export default function CandidateCard({ result }) {
         setStatus('Generating personalized message...')
         try {
             const role = localStorage.getItem('last_search_role') || 'Software Engineer'
+            const runId = localStorage.getItem('last_run_id') || ''
             const API = import.meta.env.VITE_API_URL || 'http://localhost:8000';
-            const resp = await fetch(`${API}/generate-message?candidate_id=${encodeURIComponent(result.candidate_id)}&role=${encodeURIComponent(role)}`)
+            const resp = await fetch(`${API}/generate-message?candidate_id=${encodeURIComponent(result.candidate_id)}&role=${encodeURIComponent(role)}&run_id=${encodeURIComponent(runId)}`)
             const data = await resp.json()
             setMessageText(data.message)
             setStatus(null)